@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from .models import SlowQuery
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = (
+        'sql',
+        'view',
+        'calls',
+        'total_time',
+        'max_time',
+        'last_seen',
+    )
+    list_filter = ('view',)
+    search_fields = ('sql',)
+    readonly_fields = [field.name for field in SlowQuery._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
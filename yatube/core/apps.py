@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.conf import settings
+
+        if settings.TEMPLATE_PROFILING_SAMPLE_RATE:
+            from . import template_profiling
+            template_profiling.install()
@@ -0,0 +1,51 @@
+from django.core.cache import caches
+from django.core.cache.backends import locmem
+from django.core.cache.backends.dummy import DummyCache
+
+from .metrics import registry
+
+_MISSING = object()
+
+registry.describe('cache_requests_total', 'Cache lookups by result')
+
+
+def is_process_local(alias='default'):
+    """Кеш, записи которого не видят другие процессы."""
+    return isinstance(caches[alias], (locmem.LocMemCache, DummyCache))
+
+
+class InstrumentedCacheMixin:
+    """Считает попадания и промахи кеша для метрик."""
+
+    def __init__(self, location, *args, **kwargs):
+        super().__init__(location, *args, **kwargs)
+        self._metrics_labels = (
+            ('backend', type(self).__name__),
+            ('location', location or 'default'),
+        )
+
+    def _count(self, hits, misses):
+        if hits:
+            registry.inc('cache_requests_total',
+                         self._metrics_labels + (('result', 'hit'),), hits)
+        if misses:
+            registry.inc('cache_requests_total',
+                         self._metrics_labels + (('result', 'miss'),), misses)
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        if value is _MISSING:
+            self._count(0, 1)
+            return default
+        self._count(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        result = super().get_many(keys, version)
+        self._count(len(result), len(keys) - len(result))
+        return result
+
+
+class LocMemCache(InstrumentedCacheMixin, locmem.LocMemCache):
+    pass
@@ -0,0 +1,39 @@
+"""SQLite с настройками для конкурентной нагрузки.
+
+WAL позволяет читать во время записи, busy_timeout заставляет ждать
+блокировку вместо немедленной ошибки "database is locked", а BEGIN
+IMMEDIATE берёт блокировку записи в начале транзакции: иначе
+транзакция, начавшаяся с чтения, не может дождаться повышения
+блокировки и падает сразу. Прагмы можно переопределить через
+DATABASES[...]['OPTIONS']['pragmas'].
+"""
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = {
+            **DEFAULT_PRAGMAS,
+            **self.settings_dict['OPTIONS'].get('pragmas', {}),
+        }
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,30 @@
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+class QueryCounter:
+    """Обёртка execute_wrapper, считающая число и время SQL-запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+@contextmanager
+def count_queries():
+    """Считает запросы текущего потока ко всем настроенным базам."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
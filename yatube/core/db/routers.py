@@ -0,0 +1,47 @@
+"""Маршрутизация чтений на реплики.
+
+Запросы GET/HEAD читают с одной из реплик DATABASE_REPLICAS, выбранной
+на весь запрос. Как только запрос что-то записал, дальнейшие чтения
+идут в основную базу, а ReplicaRoutingMiddleware ставит cookie, и
+следующие REPLICA_STICKY_SECONDS секунд пользователь читает из
+основной базы: так он сразу видит свой пост, комментарий или подписку,
+даже если реплика ещё отстаёт.
+"""
+import random
+import threading
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def start_request(use_replicas):
+    replicas = settings.DATABASE_REPLICAS
+    _state.replica = (random.choice(replicas)
+                      if use_replicas and replicas else None)
+    _state.wrote = False
+
+
+def end_request():
+    """Сбрасывает состояние и сообщает, была ли запись."""
+    wrote = getattr(_state, 'wrote', False)
+    _state.replica = None
+    _state.wrote = False
+    return wrote
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if getattr(_state, 'wrote', False):
+            return 'default'
+        return getattr(_state, 'replica', None)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
@@ -0,0 +1,180 @@
+"""Журнал медленных запросов.
+
+Запрос только складывает медленные запросы в буфер процесса, сгруппировав
+их по отпечатку. В базу буфер пишет фоновый поток раз в
+SLOW_QUERY_FLUSH_INTERVAL секунд, поэтому медленная база не получает по
+лишней записи на каждый медленный запрос. Журнал обрезается до
+SLOW_QUERY_LOG_SIZE командой slow_queries.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_PREFIXES = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+}
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACES = re.compile(r'\s+')
+
+_lock = threading.Lock()
+_pending = {}
+_flusher = None
+
+
+def normalize(sql):
+    """Приводит запрос к виду без литералов для группировки."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('(...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()
+
+
+class SlowQueryRecorder:
+    """execute_wrapper, запоминающий запросы дольше порога."""
+
+    def __init__(self, alias, threshold_ms):
+        self.alias = alias
+        self.threshold = threshold_ms / 1000
+        self.entries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if duration >= self.threshold:
+                self.entries.append(
+                    (self.alias, sql, params, many, duration * 1000))
+
+
+def explain(alias, sql, params):
+    connection = connections[alias]
+    prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+    if prefix is None or not sql.lstrip().upper().startswith(
+            ('SELECT', 'WITH')):
+        return ''
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return '\n'.join(
+                ' '.join(str(column) for column in row)
+                for row in cursor.fetchall()
+            )
+    except Exception as error:
+        return f'EXPLAIN failed: {error}'
+
+
+def record_slow_queries(entries, view):
+    """Добавляет записи в буфер процесса, объединяя их по отпечатку."""
+    with _lock:
+        for alias, sql, params, many, duration in entries:
+            logger.warning('Slow query (%.1f ms) in %s: %s',
+                           duration, view, sql)
+            normalized = normalize(sql)
+            key = fingerprint(normalized)
+            item = _pending.get(key)
+            if item is None:
+                if len(_pending) >= settings.SLOW_QUERY_BUFFER_SIZE:
+                    continue
+                item = _pending[key] = {
+                    'alias': alias, 'sql': sql, 'params': params,
+                    'many': many, 'normalized': normalized,
+                    'calls': 0, 'total': 0, 'max': 0,
+                }
+            item['calls'] += 1
+            item['total'] += duration
+            item['max'] = max(item['max'], duration)
+            item['view'] = view
+    _start_flusher()
+
+
+def _start_flusher():
+    global _flusher
+    interval = settings.SLOW_QUERY_FLUSH_INTERVAL
+    if not interval:
+        return
+    with _lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_forever,
+                                        args=(interval,), daemon=True)
+            _flusher.start()
+
+
+def _flush_forever(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            flush()
+        except Exception:
+            logger.exception('Slow query log flush failed')
+        finally:
+            connections.close_all()
+
+
+def flush():
+    """Пишет буфер в журнал и возвращает число записанных отпечатков."""
+    from core.models import SlowQuery
+
+    with _lock:
+        grouped = dict(_pending)
+        _pending.clear()
+    for key, item in grouped.items():
+        if _update(SlowQuery, key, item):
+            continue
+        plan = '' if item['many'] else explain(
+            item['alias'], item['sql'], item['params'])
+        try:
+            with transaction.atomic():
+                SlowQuery.objects.create(
+                    fingerprint=key,
+                    sql=item['normalized'],
+                    example=item['sql'],
+                    params=repr(item['params'])[:1000],
+                    explain=plan,
+                    view=item['view'],
+                    calls=item['calls'],
+                    total_time=item['total'],
+                    max_time=item['max'],
+                )
+        except IntegrityError:
+            # Ту же запись успел создать другой процесс.
+            _update(SlowQuery, key, item)
+    return len(grouped)
+
+
+def _update(model, key, item):
+    return model.objects.filter(fingerprint=key).update(
+        calls=F('calls') + item['calls'],
+        total_time=F('total_time') + item['total'],
+        max_time=Greatest('max_time', Value(item['max'])),
+        view=item['view'],
+    )
+
+
+def prune():
+    from core.models import SlowQuery
+
+    keep = SlowQuery.objects.values_list('pk', flat=True)[
+        :settings.SLOW_QUERY_LOG_SIZE]
+    SlowQuery.objects.exclude(pk__in=list(keep)).delete()
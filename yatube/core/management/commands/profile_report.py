@@ -0,0 +1,59 @@
+import glob
+import os
+import pstats
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = ('Объединяет профили всех воркеров для маршрута: печатает '
+            'сводку pstats и пишет общий .folded для flamegraph')
+
+    def add_arguments(self, parser):
+        parser.add_argument('route', nargs='?',
+                            help='Маршрут, например posts.main_page')
+        parser.add_argument('--limit', type=int, default=30)
+        parser.add_argument('--sort', default='cumulative')
+        parser.add_argument(
+            '--make-token', action='store_true',
+            help='Выдать значение заголовка X-Profile для ручного замера',
+        )
+
+    def handle(self, *args, **options):
+        if options['make_token']:
+            self.stdout.write(make_token())
+            return
+        directory = settings.PROFILER_DIR
+        if not options['route']:
+            # Файлы называются <маршрут>.<pid>.prof
+            routes = sorted({
+                os.path.basename(path).rsplit('.', 2)[0]
+                for path in glob.glob(os.path.join(directory, '*.*.prof'))
+            })
+            for route in routes:
+                self.stdout.write(route)
+            return
+
+        route = options['route']
+        profiles = glob.glob(os.path.join(directory, f'{route}.*.prof'))
+        if not profiles:
+            raise CommandError(f'No profiles for route {route}')
+        stats = pstats.Stats(*profiles, stream=self.stdout)
+        stats.sort_stats(options['sort']).print_stats(options['limit'])
+
+        stacks = Counter()
+        for path in glob.glob(os.path.join(directory, f'{route}.*.folded')):
+            with open(path) as source:
+                for line in source:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    stacks[stack] += int(count)
+        folded_path = os.path.join(directory, f'{route}.folded')
+        with open(folded_path, 'w') as output:
+            for stack, count in stacks.most_common():
+                output.write(f'{stack} {count}\n')
+        self.stdout.write(self.style.SUCCESS(
+            f'Merged {len(profiles)} profiles, stacks in {folded_path}'))
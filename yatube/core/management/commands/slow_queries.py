@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from core.db.slow_queries import prune
+from core.models import SlowQuery
+
+
+class Command(BaseCommand):
+    help = ('Обрезает журнал медленных запросов до SLOW_QUERY_LOG_SIZE '
+            'и показывает самые медленные из них')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--explain', action='store_true',
+                            help='Вывести план выполнения')
+        parser.add_argument('--clear', action='store_true',
+                            help='Очистить журнал')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS('Slow query log cleared'))
+            return
+        prune()
+        for query in SlowQuery.objects.all()[:options['limit']]:
+            self.stdout.write(
+                f'{query.total_time:10.1f} ms total  '
+                f'{query.calls:6d} calls  {query.max_time:8.1f} ms max  '
+                f'{query.view}'
+            )
+            self.stdout.write(f'    {query.sql}')
+            if options['explain'] and query.explain:
+                for line in query.explain.splitlines():
+                    self.stdout.write(f'      {line}')
@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+ENGINES = {
+    'plain': 'django.db.backends.sqlite3',
+    'tuned': 'core.db.backends.sqlite3',
+}
+
+
+def reader(alias, index, deadline):
+    done = 0
+    while time.monotonic() < deadline:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                'SELECT id, text FROM item WHERE author = %s '
+                'ORDER BY id DESC LIMIT 10', [index % 100])
+            cursor.fetchall()
+        done += 1
+    return 'reads', done, 0
+
+
+def writer(alias, index, deadline):
+    done = errors = 0
+    while time.monotonic() < deadline:
+        # Как get_or_create: чтение и запись в одной транзакции.
+        try:
+            with transaction.atomic(using=alias):
+                with connections[alias].cursor() as cursor:
+                    cursor.execute(
+                        'SELECT COUNT(*) FROM item WHERE author = %s',
+                        [index])
+                    cursor.execute(
+                        'INSERT INTO item (author, text) VALUES (%s, %s)',
+                        [index, 'y' * 200])
+            done += 1
+        except OperationalError:
+            errors += 1
+    return 'writes', done, errors
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность штатного и настроенного '
+            'движка SQLite при параллельных чтениях и записях')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--rows', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        try:
+            for name, engine in ENGINES.items():
+                result = self.run_engine(name, engine, directory, options)
+                self.stdout.write(
+                    f'{name:<6} reads/s={result["reads"]:9.1f} '
+                    f'writes/s={result["writes"]:8.1f} '
+                    f'locked errors={result["errors"]}'
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run_engine(self, name, engine, directory, options):
+        alias = f'sqlite_benchmark_{name}'
+        connections.databases[alias] = {
+            'ENGINE': engine,
+            'NAME': os.path.join(directory, f'{name}.sqlite3'),
+        }
+        connections.ensure_defaults(alias)
+        try:
+            self.prepare(alias, options['rows'])
+            return self.load(alias, options)
+        finally:
+            connections[alias].close()
+            del connections.databases[alias]
+
+    def prepare(self, alias, rows):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE item (id INTEGER PRIMARY KEY, '
+                'author INTEGER, text TEXT)')
+            cursor.execute('CREATE INDEX item_author ON item (author)')
+            cursor.executemany(
+                'INSERT INTO item (author, text) VALUES (%s, %s)',
+                [(i % 100, 'x' * 200) for i in range(rows)],
+            )
+
+    def load(self, alias, options):
+        deadline = time.monotonic() + options['seconds']
+        totals = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def run(func, index):
+            try:
+                kind, done, errors = func(alias, index, deadline)
+            finally:
+                connections[alias].close()
+            with lock:
+                totals[kind] += done
+                totals['errors'] += errors
+
+        threads = [
+            threading.Thread(target=run, args=(reader, i))
+            for i in range(options['readers'])
+        ] + [
+            threading.Thread(target=run, args=(writer, i))
+            for i in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = options['seconds']
+        return {
+            'reads': totals['reads'] / seconds,
+            'writes': totals['writes'] / seconds,
+            'errors': totals['errors'],
+        }
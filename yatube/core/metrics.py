@@ -0,0 +1,192 @@
+"""Счётчики и гистограммы в формате Prometheus.
+
+Каждый поток пишет в собственный шард, поэтому обновления обходятся без
+блокировок. Когда поток завершается, его шард сливается в общий итог и
+удаляется, так что число шардов не растёт с числом обслуженных потоков
+(runserver и многопоточные WSGI-серверы создают поток на запрос).
+Процесс периодически сбрасывает сводку в файл METRICS_DIR/<pid>.json,
+а эндпоинт /metrics суммирует файлы всех воркеров и живые значения
+текущего процесса.
+"""
+import json
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+PREFIX = 'yatube_'
+
+
+class Registry:
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = {}
+        # Итог шардов завершившихся потоков.
+        self._retired = ({}, {})
+        self._buckets = {}
+        self._help = {}
+        self._last_flush = time.monotonic()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = ({}, {})
+            with self._lock:
+                self._shards[id(shard)] = shard
+            weakref.finalize(threading.current_thread(), self._retire,
+                             id(shard))
+        return shard
+
+    def _retire(self, key):
+        with self._lock:
+            counters, histograms = self._shards.pop(key)
+            _merge(self._retired, counters, histograms)
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, labels=(), value=1):
+        counters = self._shard()[0]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=(), buckets=LATENCY_BUCKETS):
+        buckets = self._buckets.setdefault(name, buckets)
+        histograms = self._shard()[1]
+        key = (name, labels)
+        data = histograms.get(key)
+        if data is None:
+            # Счётчики по корзинам (последняя — +Inf) и сумма значений.
+            data = histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+        data[bisect_left(buckets, value)] += 1
+        data[-1] += value
+
+    def snapshot(self):
+        total = ({}, {})
+        with self._lock:
+            for shard_counters, shard_histograms in (
+                    list(self._shards.values()) + [self._retired]):
+                # dict.copy() выполняется атомарно под GIL.
+                _merge(total, shard_counters.copy(),
+                       shard_histograms.copy())
+        counters, histograms = total
+        return {
+            'counters': [[name, list(labels), value]
+                         for (name, labels), value in counters.items()],
+            'histograms': [[name, list(labels), self._buckets[name], data]
+                           for (name, labels), data in histograms.items()],
+            'help': self._help,
+        }
+
+    def maybe_flush(self):
+        directory = settings.METRICS_DIR
+        now = time.monotonic()
+        if not directory or now - self._last_flush < \
+                settings.METRICS_FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        self.flush(directory)
+
+    def flush(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as output:
+            json.dump(self.snapshot(), output)
+        os.replace(tmp_path, path)
+
+
+def _add_histogram(histograms, key, data):
+    current = histograms.get(key)
+    if current is None:
+        histograms[key] = data
+    else:
+        histograms[key] = [a + b for a, b in zip(current, data)]
+
+
+def _merge(target, counters, histograms):
+    target_counters, target_histograms = target
+    for key, value in counters.items():
+        target_counters[key] = target_counters.get(key, 0) + value
+    for key, data in histograms.items():
+        _add_histogram(target_histograms, key, list(data))
+
+
+def collect(registry):
+    """Сводка по всем воркерам: файлы других процессов и свой снимок."""
+    snapshots = [registry.snapshot()]
+    directory = settings.METRICS_DIR
+    if directory and os.path.isdir(directory):
+        own_file = f'{os.getpid()}.json'
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json') or filename == own_file:
+                continue
+            try:
+                with open(os.path.join(directory, filename)) as source:
+                    snapshots.append(json.load(source))
+            except (OSError, ValueError):
+                continue
+    counters = {}
+    histograms = {}
+    buckets = {}
+    help_texts = {}
+    for snapshot in snapshots:
+        help_texts.update(snapshot.get('help', {}))
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, name_buckets, data in snapshot['histograms']:
+            buckets[name] = name_buckets
+            _add_histogram(histograms, (name, tuple(map(tuple, labels))),
+                           data)
+    return counters, histograms, buckets, help_texts
+
+
+def _escape(value):
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"'
+                          for key, value in pairs) + '}'
+
+
+def render(registry):
+    counters, histograms, buckets, help_texts = collect(registry)
+    lines = []
+    seen = set()
+
+    def header(name, kind):
+        if name in seen:
+            return
+        seen.add(name)
+        if name in help_texts:
+            lines.append(f'# HELP {PREFIX}{name} {help_texts[name]}')
+        lines.append(f'# TYPE {PREFIX}{name} {kind}')
+
+    for (name, labels), value in sorted(counters.items()):
+        header(name, 'counter')
+        lines.append(f'{PREFIX}{name}{_labels(labels)} {value}')
+    for (name, labels), data in sorted(histograms.items()):
+        header(name, 'histogram')
+        cumulative = 0
+        for bound, count in zip(list(buckets[name]) + ['+Inf'], data[:-1]):
+            cumulative += count
+            lines.append(f'{PREFIX}{name}_bucket'
+                         f'{_labels(labels, [("le", bound)])} {cumulative}')
+        lines.append(f'{PREFIX}{name}_sum{_labels(labels)} {data[-1]}')
+        lines.append(f'{PREFIX}{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
@@ -0,0 +1,147 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core.db import routers
+from core.db.queries import count_queries
+from core.db.slow_queries import SlowQueryRecorder, record_slow_queries
+
+from . import template_profiling
+from .profiling import RequestProfiler, token_is_valid
+from .metrics import SIZE_BUCKETS, registry
+
+registry.describe('http_requests_total', 'Requests by route and status')
+registry.describe('http_request_duration_seconds', 'Request latency')
+registry.describe('http_response_size_bytes', 'Response body size')
+registry.describe('db_queries_total', 'SQL queries by route')
+registry.describe('db_query_duration_seconds_total', 'SQL time by route')
+
+
+def route_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unmatched'
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with count_queries() as queries:
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        route = (('route', route_name(request)),)
+        registry.inc('http_requests_total', route + (
+            ('method', request.method),
+            ('status', str(response.status_code)),
+        ))
+        registry.observe('http_request_duration_seconds', duration, route)
+        registry.inc('db_queries_total', route, queries.count)
+        registry.inc('db_query_duration_seconds_total', route,
+                     queries.duration)
+        if not response.streaming:
+            registry.observe('http_response_size_bytes',
+                             len(response.content), route, SIZE_BUCKETS)
+        registry.maybe_flush()
+        return response
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        threshold = settings.SLOW_QUERY_THRESHOLD_MS
+        if threshold is None:
+            return self.get_response(request)
+        recorders = []
+        with ExitStack() as stack:
+            for connection in connections.all():
+                recorder = SlowQueryRecorder(connection.alias, threshold)
+                recorders.append(recorder)
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        entries = [entry for recorder in recorders
+                   for entry in recorder.entries]
+        if entries:
+            record_slow_queries(entries, route_name(request))
+        return response
+
+
+class TemplateProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.TEMPLATE_PROFILING_SAMPLE_RATE
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+        template_profiling.install()
+        template_profiling.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stats = template_profiling.stop()
+        if stats:
+            response['X-Template-Profile'] = template_profiling.summary(stats)
+        return response
+
+
+class SamplingProfilerMiddleware:
+    """Профилирует 1 из PROFILER_SAMPLE_EVERY запросов и запросы
+    с подписанным заголовком X-Profile (см. core.profiling)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        every = settings.PROFILER_SAMPLE_EVERY
+        if every and random.randrange(every) == 0:
+            return True
+        token = request.META.get('HTTP_X_PROFILE')
+        return bool(token) and token_is_valid(token)
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        profiler = RequestProfiler()
+        try:
+            profiler.start()
+        except ValueError:
+            # В процессе уже работает другой профилировщик.
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+        profiler.save(route_name(request))
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cookie = settings.REPLICA_STICKY_COOKIE
+        try:
+            sticky = float(request.COOKIES.get(cookie, 0)) > time.time()
+        except ValueError:
+            sticky = False
+        routers.start_request(
+            request.method in ('GET', 'HEAD') and not sticky)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.end_request()
+        if wrote and settings.DATABASE_REPLICAS:
+            seconds = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(cookie, str(time.time() + seconds),
+                                max_age=seconds, httponly=True,
+                                samesite='Lax')
+        return response
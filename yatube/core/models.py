@@ -9,3 +9,24 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class SlowQuery(models.Model):
+    fingerprint = models.CharField(max_length=40, unique=True)
+    sql = models.TextField('Нормализованный запрос')
+    example = models.TextField('Пример запроса')
+    params = models.TextField('Параметры примера', blank=True)
+    explain = models.TextField('План выполнения', blank=True)
+    view = models.CharField('Представление', max_length=200, blank=True)
+    calls = models.PositiveIntegerField('Вызовов', default=0)
+    total_time = models.FloatField('Суммарное время, мс', default=0)
+    max_time = models.FloatField('Максимальное время, мс', default=0)
+    last_seen = models.DateTimeField('Последний раз', auto_now=True)
+
+    class Meta:
+        ordering = ('-total_time',)
+        verbose_name = 'Медленный запрос'
+        verbose_name_plural = 'Медленные запросы'
+
+    def __str__(self):
+        return self.sql[:100]
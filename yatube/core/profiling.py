@@ -0,0 +1,99 @@
+"""Выборочное профилирование запросов.
+
+Профилируется каждый N-й (в среднем) запрос или запрос с подписанным
+заголовком X-Profile. Для попавших в выборку запросов одновременно
+работают cProfile (файлы .prof для pstats) и сэмплер стеков потока
+(файлы .folded для flamegraph.pl / speedscope). Данные копятся по
+маршрутам в памяти процесса и сбрасываются в PROFILER_DIR в файлы
+<маршрут>.<pid>.*, которые объединяет команда profile_report.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+SIGNER_SALT = 'core.profiling'
+TOKEN_VALUE = 'profile'
+
+_lock = threading.Lock()
+_stats = {}
+_stacks = {}
+
+
+def make_token():
+    return signing.TimestampSigner(salt=SIGNER_SALT).sign(TOKEN_VALUE)
+
+
+def token_is_valid(token):
+    try:
+        value = signing.TimestampSigner(salt=SIGNER_SALT).unsign(
+            token, max_age=settings.PROFILER_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return value == TOKEN_VALUE
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', code.co_filename)
+    return f'{module}:{code.co_name}'
+
+
+class StackSampler(threading.Thread):
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class RequestProfiler:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(),
+                                    settings.PROFILER_INTERVAL)
+
+    def start(self):
+        self.profile.enable()
+        self.sampler.start()
+
+    def stop(self):
+        self.profile.disable()
+        self.sampler.stop()
+
+    def save(self, route):
+        route = route.replace(':', '.').replace('/', '_')
+        directory = settings.PROFILER_DIR
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f'{route}.{os.getpid()}')
+        with _lock:
+            if route in _stats:
+                _stats[route].add(self.profile)
+            else:
+                _stats[route] = pstats.Stats(self.profile)
+            _stats[route].dump_stats(f'{base}.prof')
+            stacks = _stacks.setdefault(route, Counter())
+            stacks.update(self.sampler.stacks)
+            with open(f'{base}.folded', 'w') as output:
+                for stack, count in stacks.most_common():
+                    output.write(f'{stack} {count}\n')
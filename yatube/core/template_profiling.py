@@ -0,0 +1,105 @@
+"""Профилирование рендеринга шаблонов по выборке запросов.
+
+install() оборачивает Template._render, тег include, а также теги и
+фильтры библиотек, подключаемых через {% load %} (thumbnail, addclass и
+другие). Пока текущий запрос не попал в выборку, обёртка только
+проверяет флаг потока и сразу вызывает исходную функцию. Время
+включает вложенные шаблоны и теги.
+"""
+import functools
+import threading
+import time
+
+from django.template import engines
+from django.template.base import Template
+from django.template.loader_tags import IncludeNode
+
+from .metrics import registry
+
+registry.describe('template_render_calls_total',
+                  'Sampled template, include and tag renders')
+registry.describe('template_render_seconds_total',
+                  'Sampled inclusive render time')
+
+_state = threading.local()
+_installed = False
+
+
+def start():
+    _state.stats = {}
+
+
+def stop():
+    """Завершает выборку и возвращает {метка: [вызовы, секунды]}."""
+    stats = getattr(_state, 'stats', None)
+    _state.stats = None
+    for label, (calls, seconds) in (stats or {}).items():
+        labels = (('name', label),)
+        registry.inc('template_render_calls_total', labels, calls)
+        registry.inc('template_render_seconds_total', labels, seconds)
+    return stats or {}
+
+
+def summary(stats, limit=10):
+    items = sorted(stats.items(), key=lambda item: item[1][1], reverse=True)
+    return ', '.join(
+        f'{label};count={calls};ms={seconds * 1000:.2f}'
+        for label, (calls, seconds) in items[:limit]
+    )
+
+
+def _timed(label_func, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stats = getattr(_state, 'stats', None)
+        if stats is None:
+            return func(*args, **kwargs)
+        start_time = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            entry = stats.setdefault(label_func(*args), [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+    return wrapper
+
+
+def _template_label(template, *args):
+    name = getattr(template.origin, 'template_name', None) or template.name
+    return name or '<string>'
+
+
+def _include_label(node, *args):
+    return f'include:{node.template.var}'
+
+
+def _constant(label):
+    return lambda *args: label
+
+
+def _wrap_tag(name, compile_func):
+    @functools.wraps(compile_func)
+    def compile_and_wrap(parser, token):
+        node = compile_func(parser, token)
+        node.render = _timed(_constant(f'tag:{name}'), node.render)
+        return node
+    return compile_and_wrap
+
+
+def install():
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    Template._render = _timed(_template_label, Template._render)
+    IncludeNode.render = _timed(_include_label, IncludeNode.render)
+    for engine in engines.all():
+        libraries = getattr(getattr(engine, 'engine', None),
+                            'template_libraries', {})
+        for library in libraries.values():
+            for name, compile_func in list(library.tags.items()):
+                library.tags[name] = _wrap_tag(name, compile_func)
+            for name, filter_func in list(library.filters.items()):
+                library.filters[name] = _timed(
+                    _constant(f'filter:{name}'), filter_func)
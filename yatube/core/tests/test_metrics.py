@@ -0,0 +1,95 @@
+import gc
+import os
+import shutil
+import tempfile
+import threading
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import Registry, render
+
+TEMP_METRICS_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class RegistryTest(TestCase):
+    def test_thread_shards_are_summed(self):
+        registry = Registry()
+
+        def work():
+            for _ in range(100):
+                registry.inc('jobs_total', (('kind', 'a'),))
+                registry.observe('job_seconds', 0.02)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        text = render(registry)
+        self.assertIn('yatube_jobs_total{kind="a"} 400', text)
+        self.assertIn('yatube_job_seconds_bucket{le="0.01"} 0', text)
+        self.assertIn('yatube_job_seconds_bucket{le="0.025"} 400', text)
+        self.assertIn('yatube_job_seconds_count 400', text)
+
+    def test_finished_thread_shards_are_merged(self):
+        registry = Registry()
+        registry.inc('jobs_total')
+        for _ in range(20):
+            thread = threading.Thread(
+                target=lambda: registry.inc('jobs_total'))
+            thread.start()
+            thread.join()
+            del thread
+        gc.collect()
+        # Остался только шард текущего потока.
+        self.assertEqual(len(registry._shards), 1)
+        self.assertIn('yatube_jobs_total 21', render(registry))
+
+    @override_settings(METRICS_DIR=TEMP_METRICS_DIR)
+    def test_worker_files_are_aggregated(self):
+        other_worker = Registry()
+        other_worker.inc('jobs_total', value=5)
+        other_worker.flush(TEMP_METRICS_DIR)
+        # Файл текущего процесса не читается, поэтому «переселяем» его.
+        os.replace(os.path.join(TEMP_METRICS_DIR, f'{os.getpid()}.json'),
+                   os.path.join(TEMP_METRICS_DIR, '1.json'))
+
+        registry = Registry()
+        registry.inc('jobs_total', value=2)
+        self.assertIn('yatube_jobs_total 7', render(registry))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_METRICS_DIR, ignore_errors=True)
+
+
+class MetricsEndpointTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_request_metrics_exposed(self):
+        self.guest_client.get(reverse('posts:main_page'))
+        self.guest_client.get(reverse('posts:main_page'))
+        response = self.guest_client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        text = response.content.decode()
+        self.assertIn('yatube_http_requests_total{route="posts:main_page"',
+                      text)
+        self.assertIn('yatube_http_request_duration_seconds_bucket', text)
+        self.assertIn('yatube_db_queries_total{route="posts:main_page"}',
+                      text)
+        self.assertIn('yatube_http_response_size_bytes_count', text)
+        self.assertIn('result="hit"', text)
+        self.assertIn('result="miss"', text)
+
+    def test_forbidden_for_other_hosts(self):
+        response = self.guest_client.get(reverse('metrics'),
+                                         REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
@@ -0,0 +1,55 @@
+import glob
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.profiling import make_token
+
+TEMP_PROFILER_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(PROFILER_DIR=TEMP_PROFILER_DIR, PROFILER_SAMPLE_EVERY=0)
+class SamplingProfilerTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_PROFILER_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_PROFILER_DIR, ignore_errors=True)
+        self.guest_client = Client()
+
+    def profiles(self):
+        return glob.glob(os.path.join(TEMP_PROFILER_DIR, '*.prof'))
+
+    def test_not_sampled_by_default(self):
+        self.guest_client.get(reverse('posts:main_page'))
+        self.guest_client.get(reverse('posts:main_page'),
+                              HTTP_X_PROFILE='forged')
+        self.assertEqual(self.profiles(), [])
+
+    @override_settings(PROFILER_SAMPLE_EVERY=1)
+    def test_sampled_request_writes_stats(self):
+        self.guest_client.get(reverse('posts:main_page'))
+        self.guest_client.get(reverse('posts:main_page'))
+        prefix = os.path.join(TEMP_PROFILER_DIR,
+                              f'posts.main_page.{os.getpid()}')
+        self.assertTrue(os.path.exists(f'{prefix}.prof'))
+        self.assertTrue(os.path.exists(f'{prefix}.folded'))
+
+        out = StringIO()
+        call_command('profile_report', 'posts.main_page', stdout=out)
+        self.assertIn('function calls', out.getvalue())
+
+    def test_signed_header_forces_profiling(self):
+        self.guest_client.get(reverse('posts:main_page'),
+                              HTTP_X_PROFILE=make_token())
+        self.assertEqual(len(self.profiles()), 1)
@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.db import routers
+from posts.models import Post
+
+User = get_user_model()
+COOKIE = 'read_primary_until'
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(TestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        # Записи вне запроса (фикстуры других тестов) оставляют отметку.
+        routers.end_request()
+        self.addCleanup(routers.end_request)
+
+    def test_reads_go_to_replica(self):
+        routers.start_request(use_replicas=True)
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_reads_after_write_go_to_primary(self):
+        routers.start_request(use_replicas=True)
+        self.router.db_for_write(Post)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertTrue(routers.end_request())
+
+    def test_no_replica_outside_request(self):
+        self.assertIsNone(self.router.db_for_read(Post))
+        routers.start_request(use_replicas=False)
+        self.assertIsNone(self.router.db_for_read(Post))
+
+
+# Реплика совпадает с основной базой: проверяется только cookie.
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaRoutingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.user = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Текст')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_read_sets_no_cookie(self):
+        response = self.client.get(reverse('posts:main_page'))
+        self.assertNotIn(COOKIE, response.cookies)
+
+    def test_comment_pins_reads_to_primary(self):
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Комментарий'})
+        self.assertIn(COOKIE, response.cookies)
+        self.assertEqual(response.cookies[COOKIE]['max-age'], 10)
+
+    def test_follow_pins_reads_to_primary(self):
+        response = self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author.username}))
+        self.assertIn(COOKIE, response.cookies)
+
+
+# Настоящий второй псевдоним: replica — тестовое зеркало default.
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaDatabaseTest(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.user = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(author=self.author, text='Текст')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def get(self, name, **kwargs):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(reverse(name, kwargs=kwargs))
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    def test_reads_go_to_replica_until_write(self):
+        primary, replica = self.get('posts:main_page')
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Комментарий'})
+        self.assertIn(COOKIE, response.cookies)
+
+        cache.clear()
+        primary, replica = self.get('posts:main_page')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
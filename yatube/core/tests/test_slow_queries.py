@@ -0,0 +1,75 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.db.slow_queries import flush, normalize
+from core.models import SlowQuery
+from posts.models import Post
+
+User = get_user_model()
+
+
+class NormalizeTest(TestCase):
+    def test_literals_and_in_lists_are_collapsed(self):
+        self.assertEqual(
+            normalize("SELECT * FROM t WHERE a = 'x'  AND b IN (%s, %s, %s)"),
+            'SELECT * FROM t WHERE a = ? AND b IN (...)',
+        )
+        self.assertEqual(normalize('SELECT 1 LIMIT 10'),
+                         normalize('SELECT 2 LIMIT 20'))
+
+
+@override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_LOG_SIZE=50,
+                   SLOW_QUERY_FLUSH_INTERVAL=None)
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        flush()
+
+    def test_queries_are_recorded_with_plan(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.guest_client.get(url)
+        # До сброса буфера запрос ничего не пишет в журнал.
+        self.assertFalse(SlowQuery.objects.exists())
+        flush()
+        query = SlowQuery.objects.filter(
+            sql__contains='FROM "posts_post"').first()
+        self.assertIsNotNone(query)
+        self.assertEqual(query.view, 'posts:post_detail')
+        self.assertTrue(query.explain)
+        calls = query.calls
+
+        self.guest_client.get(url)
+        flush()
+        query.refresh_from_db()
+        self.assertEqual(query.calls, calls * 2)
+
+    @override_settings(SLOW_QUERY_LOG_SIZE=1)
+    def test_log_is_pruned_by_command(self):
+        self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertGreater(flush(), 1)
+        call_command('slow_queries', stdout=StringIO())
+        self.assertEqual(SlowQuery.objects.count(), 1)
+
+    def test_report_command(self):
+        self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        flush()
+        out = StringIO()
+        call_command('slow_queries', explain=True, stdout=out)
+        self.assertIn('posts:post_detail', out.getvalue())
+
+        call_command('slow_queries', clear=True, stdout=StringIO())
+        self.assertFalse(SlowQuery.objects.exists())
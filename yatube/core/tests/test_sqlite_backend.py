@@ -0,0 +1,28 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+
+class TunedSqliteBackendTest(TestCase):
+    @skipUnless(connection.vendor == 'sqlite', 'Только для SQLite')
+    def test_pragmas_applied(self):
+        expected = {
+            'synchronous': 1,
+            'busy_timeout': 5000,
+            'temp_store': 2,
+        }
+        with connection.cursor() as cursor:
+            for pragma, value in expected.items():
+                with self.subTest(pragma=pragma):
+                    cursor.execute(f'PRAGMA {pragma}')
+                    self.assertEqual(cursor.fetchone()[0], value)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('sqlite_benchmark', seconds=0.2, readers=1, writers=1,
+                     rows=100, stdout=out)
+        self.assertIn('plain', out.getvalue())
+        self.assertIn('tuned', out.getvalue())
@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import engines
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import template_profiling
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(TEMPLATE_PROFILING_SAMPLE_RATE=1)
+class TemplateProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        template_profiling.install()
+        # Шаблоны, разобранные до install(), лежат в кеше загрузчика
+        # с необёрнутыми тегами.
+        for loader in engines['django'].engine.template_loaders:
+            if hasattr(loader, 'reset'):
+                loader.reset()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_profile_header(self):
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        header = response['X-Template-Profile']
+        self.assertIn('posts/post_detail.html;count=1', header)
+        self.assertIn('include:includes/add_comment.html', header)
+        self.assertIn('filter:addclass;count=1', header)
+
+    def test_metrics_exposed(self):
+        self.authorized_client.get(reverse('posts:main_page'))
+        self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        response = self.authorized_client.get(reverse('metrics'))
+        content = response.content.decode()
+        self.assertIn(
+            'yatube_template_render_calls_total{name="posts/index.html"}',
+            content,
+        )
+        self.assertIn(
+            'yatube_template_render_calls_total{name="tag:thumbnail"}',
+            content,
+        )
+        self.assertIn(
+            'yatube_template_render_calls_total{name="filter:addclass"}',
+            content,
+        )
+
+    @override_settings(TEMPLATE_PROFILING_SAMPLE_RATE=0)
+    def test_no_header_without_sampling(self):
+        response = self.authorized_client.get(reverse('posts:main_page'))
+        self.assertNotIn('X-Template-Profile', response)
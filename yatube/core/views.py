@@ -1,7 +1,11 @@
 from http import HTTPStatus
 
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
 
+from . import metrics as core_metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -14,3 +18,10 @@ def csrf_failure(request, reason=''):
 def server_error(request):
     status = HTTPStatus.INTERNAL_SERVER_ERROR
     return render(request, 'core/500.html', status=status)
+
+
+def metrics(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(core_metrics.render(core_metrics.registry),
+                        content_type='text/plain; version=0.0.4')
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Comment, Follow, Group, Post
+from .models import Comment, Follow, Group, Post, Recommendation
 
 
 @admin.register(Post)
@@ -21,3 +21,10 @@ class PostAdmin(admin.ModelAdmin):
 admin.site.register(Group)
 admin.site.register(Comment)
 admin.site.register(Follow)
+
+
+@admin.register(Recommendation)
+class RecommendationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'author', 'score')
+    list_select_related = ('user', 'author')
+    search_fields = ('user__username',)
@@ -0,0 +1,236 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db.models import Count, Max
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from django.utils.http import quote_etag
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_POST, require_safe
+from django.views.decorators.vary import vary_on_cookie
+
+from .changes import (INDEX_SCOPE, author_scope, group_scope,
+                      high_water_mark, new_posts)
+from .models import Group, Post, User
+from .pagination import FEED_ORDERING, InvalidCursor, KeysetPaginator
+from .subscriptions import follow_authors, unfollow_authors
+
+# Поле ответа -> выражение для .values()
+API_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _requested_fields(request):
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(API_FIELDS)
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = set(fields) - set(API_FIELDS)
+    if unknown:
+        raise BadRequest(f'Unknown fields: {", ".join(sorted(unknown))}')
+    return fields
+
+
+def _serialize(rows, fields):
+    media_url = settings.MEDIA_URL
+    result = []
+    for row in rows:
+        item = {name: row[API_FIELDS[name]] for name in fields}
+        if item.get('image'):
+            item['image'] = media_url + item['image']
+        result.append(item)
+    return result
+
+
+def _json_response(request, payload, status=200):
+    response = JsonResponse(payload, status=status,
+                            json_dumps_params={'ensure_ascii': False})
+    if status != 200:
+        return response
+    etag = quote_etag(hashlib.md5(response.content).hexdigest())
+    response['ETag'] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def _feed_response(request, queryset):
+    try:
+        fields = _requested_fields(request)
+        # Поля ключа пагинации нужны всегда, даже если их не запросили.
+        columns = {API_FIELDS[name] for name in fields} | {'id', 'pub_date'}
+        paginator = KeysetPaginator(queryset.values(*columns),
+                                    FEED_ORDERING, settings.PAGINATOR_VALUE)
+        page = paginator.page(request.GET.get('cursor'))
+    except BadRequest as error:
+        return _json_response(request, {'error': str(error)}, status=400)
+    except InvalidCursor:
+        return _json_response(request, {'error': 'Invalid cursor'},
+                              status=400)
+    next_url = None
+    if page.has_next:
+        params = request.GET.copy()
+        params['cursor'] = page.next_cursor
+        next_url = request.build_absolute_uri(
+            f'{request.path}?{params.urlencode()}')
+    return _json_response(request, {
+        'results': _serialize(page, fields),
+        'next': next_url,
+    })
+
+
+@require_safe
+def index(request):
+    return _feed_response(request, Post.objects.all())
+
+
+@require_safe
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _feed_response(request, group.posts.all())
+
+
+@require_safe
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return _feed_response(request, author.posts.all())
+
+
+@require_safe
+def post_detail(request, post_id):
+    try:
+        fields = _requested_fields(request)
+    except BadRequest as error:
+        return _json_response(request, {'error': str(error)}, status=400)
+    row = get_object_or_404(
+        Post.objects.values(*{API_FIELDS[name] for name in fields}),
+        pk=post_id,
+    )
+    return _json_response(request, _serialize([row], fields)[0])
+
+
+def _parse_since(request):
+    since = request.GET.get('since')
+    since_time = request.GET.get('since_time')
+    if since is not None:
+        try:
+            return 'pk', int(since)
+        except ValueError:
+            raise BadRequest('Invalid since')
+    if since_time is not None:
+        try:
+            value = parse_datetime(since_time)
+        except ValueError:
+            value = None
+        if value is None:
+            raise BadRequest('Invalid since_time')
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, timezone.utc)
+        return 'pub_date', value
+    raise BadRequest('Pass since or since_time')
+
+
+def _new_since_response(request, scope, queryset, mark_queryset=None):
+    """Сколько постов новее since (id) или since_time (ISO 8601).
+
+    Пока клиент не отстал от закешированной верхней отметки ленты,
+    ответ обходится без запросов к базе.
+    """
+    try:
+        field, since = _parse_since(request)
+    except BadRequest as error:
+        return _json_response(request, {'error': str(error)}, status=400)
+    if mark_queryset is None:
+        mark_queryset = queryset
+    mark = high_water_mark(scope, mark_queryset)
+    if mark[field] is None or since >= mark[field]:
+        result = {'count': 0, 'latest': None}
+    elif field == 'pk':
+        result = new_posts(queryset, since)
+    else:
+        result = queryset.filter(pub_date__gt=since).aggregate(
+            count=Count('pk'), latest=Max('pk'))
+    return _json_response(request, result)
+
+
+@require_safe
+@cache_page(settings.NEW_SINCE_CACHE_TIMEOUT)
+def index_new(request):
+    return _new_since_response(request, INDEX_SCOPE, Post.objects.all())
+
+
+@require_safe
+@cache_page(settings.NEW_SINCE_CACHE_TIMEOUT)
+def group_new(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _new_since_response(request, group_scope(group.slug),
+                               group.posts.all())
+
+
+@require_safe
+@cache_page(settings.NEW_SINCE_CACHE_TIMEOUT)
+def profile_new(request, username):
+    author = get_object_or_404(User, username=username)
+    return _new_since_response(request, author_scope(author.username),
+                               author.posts.all())
+
+
+@require_safe
+@login_required
+@cache_page(settings.NEW_SINCE_CACHE_TIMEOUT)
+@vary_on_cookie
+def follow_new(request):
+    # Отметка общей ленты не меньше отметки ленты подписок, поэтому
+    # годится для быстрой проверки «ничего нового».
+    return _new_since_response(
+        request, INDEX_SCOPE,
+        Post.objects.filter(author__following__user=request.user),
+        mark_queryset=Post.objects.all())
+
+
+@login_required
+@require_POST
+def follow_bulk(request):
+    """Подписка или отписка сразу от многих авторов.
+
+    Авторы передаются списком author (имена пользователей) и/или слагом
+    group — тогда берутся все авторы группы; action: follow или unfollow.
+    """
+    action = request.POST.get('action', 'follow')
+    if action not in ('follow', 'unfollow'):
+        return _json_response(request, {'error': 'Invalid action'},
+                              status=400)
+    limit = settings.BULK_FOLLOW_LIMIT
+    usernames = request.POST.getlist('author')
+    author_ids = set(User.objects.filter(username__in=usernames)
+                     .values_list('pk', flat=True)) if usernames else set()
+    slug = request.POST.get('group')
+    if slug:
+        group = get_object_or_404(Group, slug=slug)
+        # Одного лишнего автора хватает, чтобы отказать целиком.
+        author_ids.update(group.posts.order_by()
+                          .values_list('author_id', flat=True)
+                          .distinct()[:limit + 1])
+    if not author_ids:
+        return _json_response(request, {'error': 'No authors'},
+                              status=400)
+    if len(author_ids) > limit:
+        return _json_response(
+            request, {'error': f'Too many authors, max {limit}'},
+            status=400)
+    change = follow_authors if action == 'follow' else unfollow_authors
+    changed = change(request.user, author_ids)
+    return _json_response(request, {'action': action,
+                                    'changed': len(changed)})
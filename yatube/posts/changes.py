@@ -0,0 +1,86 @@
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from core.cache import is_process_local
+
+INDEX_SCOPE = 'index'
+# Список групп: меняется при создании, правке и удалении группы.
+GROUPS_SCOPE = 'groups'
+VERSION_KEY = 'posts:scope-version:{}'
+HIGH_WATER_KEY = 'posts:high-water:{}:{}'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def post_scopes(post):
+    scopes = [INDEX_SCOPE, author_scope(post.author.username)]
+    if post.group_id:
+        scopes.append(group_scope(post.group.slug))
+    return scopes
+
+
+def cache_timeout(timeout=None):
+    """Срок записей кеша, которые сбрасываются при изменении данных.
+
+    Кеш в памяти процесса не показывает другим воркерам ни смену версии
+    ленты, ни удаление ключа, поэтому с ним такие записи истекают сами
+    через LOCAL_FEED_CACHE_TIMEOUT секунд, а с общим кешем живут timeout
+    (по умолчанию FEED_CACHE_TIMEOUT).
+    """
+    if is_process_local():
+        return settings.LOCAL_FEED_CACHE_TIMEOUT
+    return timeout or settings.FEED_CACHE_TIMEOUT
+
+
+def scope_version(scope):
+    """Текущая версия ленты: меняется при любом изменении её постов."""
+    key = VERSION_KEY.format(quote(scope))
+    version = cache.get(key)
+    if version is None:
+        # Начальное значение из времени, чтобы после вытеснения ключа
+        # из кеша версия не совпала ни с одной из выданных ранее.
+        # В общем кеше версия живёт до вытеснения.
+        cache.add(key, time.time_ns(),
+                  settings.LOCAL_FEED_CACHE_TIMEOUT
+                  if is_process_local() else None)
+        version = cache.get(key)
+    return version
+
+
+def bump_scope(scope):
+    """Меняет версию ленты и возвращает новую."""
+    try:
+        return cache.incr(VERSION_KEY.format(quote(scope)))
+    except ValueError:
+        return scope_version(scope)
+
+
+def bump_scopes(scopes):
+    for scope in set(scopes):
+        bump_scope(scope)
+
+
+def high_water_mark(scope, queryset):
+    """Наибольшие pk и pub_date в ленте, кешируются до её изменения."""
+    key = HIGH_WATER_KEY.format(quote(scope), scope_version(scope))
+    mark = cache.get(key)
+    if mark is None:
+        mark = queryset.aggregate(pk=Max('pk'), pub_date=Max('pub_date'))
+        cache.set(key, mark, cache_timeout())
+    return mark
+
+
+def new_posts(queryset, since):
+    """Число постов новее since и наибольший pk среди них."""
+    return queryset.filter(pk__gt=since).aggregate(
+        count=Count('pk'), latest=Max('pk'))
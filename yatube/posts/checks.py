@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from core.cache import is_process_local
+
+
+@register()
+def follow_graph_cache(app_configs, **kwargs):
+    """Граф подписок синхронизируется через кеш и без общего кеша
+    в других процессах устаревает."""
+    if settings.FOLLOW_GRAPH and is_process_local():
+        return [Error(
+            'FOLLOW_GRAPH требует общего для всех процессов кеша.',
+            hint='Настройте memcached или redis либо выключите '
+                 'FOLLOW_GRAPH.',
+            id='posts.E001',
+        )]
+    return []
@@ -0,0 +1,9 @@
+from .following import FollowState
+
+
+def follow_state(request):
+    """Подписки зрителя для шаблонов: `{% if author in follow_state %}`.
+
+    Множество подписок читается только при первой проверке в шаблоне.
+    """
+    return {'follow_state': FollowState(request.user)}
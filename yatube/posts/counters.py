@@ -0,0 +1,56 @@
+"""Денормализованные счётчики подписчиков и подписок.
+
+Строка FollowCounter пользователя меняется через F() сигналами Follow и
+одним пакетом при массовых подписках, поэтому профиль и списки подписок
+читают оба числа одним запросом по первичному ключу, а не COUNT по
+таблице Follow.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Follow, FollowCounter
+
+
+def follow_counts(user_id):
+    """Число подписчиков и подписок пользователя."""
+    counts = (FollowCounter.objects.filter(pk=user_id)
+              .values_list('followers', 'following').first())
+    return counts or (0, 0)
+
+
+def followers_counts(user_ids):
+    return dict(FollowCounter.objects.filter(pk__in=user_ids)
+                .values_list('pk', 'followers'))
+
+
+def count_follows(user_id, author_ids, delta):
+    """Учитывает подписку (delta=1) или отписку (delta=-1) от авторов."""
+    author_ids = list(author_ids)
+    if not author_ids:
+        return
+    if delta > 0:
+        FollowCounter.objects.bulk_create(
+            [FollowCounter(user_id=pk) for pk in {user_id, *author_ids}],
+            ignore_conflicts=True,
+        )
+    FollowCounter.objects.filter(pk=user_id).update(
+        following=F('following') + delta * len(author_ids))
+    FollowCounter.objects.filter(pk__in=author_ids).update(
+        followers=F('followers') + delta)
+
+
+def rebuild():
+    """Пересчитывает все счётчики по таблице Follow."""
+    followers = dict(Follow.objects.values('author_id')
+                     .annotate(count=Count('id'))
+                     .values_list('author_id', 'count'))
+    following = dict(Follow.objects.values('user_id')
+                     .annotate(count=Count('id'))
+                     .values_list('user_id', 'count'))
+    with transaction.atomic():
+        FollowCounter.objects.all().delete()
+        FollowCounter.objects.bulk_create(
+            [FollowCounter(user_id=user_id,
+                           followers=followers.get(user_id, 0),
+                           following=following.get(user_id, 0))
+             for user_id in followers.keys() | following.keys()])
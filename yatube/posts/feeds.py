@@ -0,0 +1,133 @@
+from urllib.parse import quote
+
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.encoding import escape_uri_path
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+from django.views.decorators.http import condition
+
+from .changes import (INDEX_SCOPE, author_scope, cache_timeout, group_scope,
+                      scope_version)
+from .models import Group, Post, User
+
+FEED_SIZE = 20
+# Клиенты перепроверяют ленту по ETag, поэтому max-age небольшой,
+# а серверный кеш живёт до следующего изменения ленты (см.
+# changes.cache_timeout).
+FEED_MAX_AGE = 60
+
+
+class LatestPostsFeed(Feed):
+    title = 'Yatube: последние обновления'
+    description = 'Новые записи на сайте'
+
+    def link(self):
+        return reverse('posts:main_page')
+
+    def items(self):
+        return Post.objects.select_related('author', 'group')[:FEED_SIZE]
+
+    def item_title(self, item):
+        return Truncator(item.text).words(10)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', kwargs={'post_id': item.pk})
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+
+class GroupPostsFeed(LatestPostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', kwargs={'slug': obj.slug})
+
+    def items(self, obj):
+        return obj.posts.select_related('author', 'group')[:FEED_SIZE]
+
+
+class AuthorPostsFeed(LatestPostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: записи {obj.username}'
+
+    def description(self, obj):
+        return f'Новые записи пользователя {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', kwargs={'username': obj.username})
+
+    def items(self, obj):
+        return obj.posts.select_related('author', 'group')[:FEED_SIZE]
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class GroupPostsAtomFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return obj.description
+
+
+class AuthorPostsAtomFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+def cached_feed(feed, get_scope):
+    """Отдаёт ленту из кеша с поддержкой условного GET.
+
+    ETag строится из версии области ленты (см. posts.changes), поэтому
+    ответ 304 и попадание в кеш обходятся без запросов к базе, а любое
+    изменение поста в области сразу делает старую запись кеша ненужной.
+    """
+    def get_etag(request, **kwargs):
+        scope = get_scope(**kwargs)
+        return f'{quote(scope)}-{scope_version(scope)}'
+
+    @condition(etag_func=get_etag)
+    def view(request, **kwargs):
+        key = (f'posts:feed:{escape_uri_path(request.path)}:'
+               f'{get_etag(request, **kwargs)}')
+        response = cache.get(key)
+        if response is None:
+            response = feed(request, **kwargs)
+            patch_cache_control(response, public=True, max_age=FEED_MAX_AGE)
+            cache.set(key, response, cache_timeout())
+        return response
+
+    return view
+
+
+index_rss = cached_feed(LatestPostsFeed(), lambda: INDEX_SCOPE)
+index_atom = cached_feed(LatestPostsAtomFeed(), lambda: INDEX_SCOPE)
+group_rss = cached_feed(GroupPostsFeed(), group_scope)
+group_atom = cached_feed(GroupPostsAtomFeed(), group_scope)
+profile_rss = cached_feed(AuthorPostsFeed(), author_scope)
+profile_atom = cached_feed(AuthorPostsAtomFeed(), author_scope)
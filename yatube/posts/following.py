@@ -0,0 +1,47 @@
+"""На кого подписан пользователь: кешированное множество id авторов.
+
+Множество читается из кеша одним обращением на запрос (или одним
+запросом к базе при промахе) и сбрасывается сигналами Follow после
+коммита, поэтому шаблон может спрашивать про любое число авторов без
+новых запросов.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .changes import cache_timeout
+from .models import Follow
+
+FOLLOWING_KEY = 'posts:following:{}'
+
+
+def following_ids(user_id):
+    key = FOLLOWING_KEY.format(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(Follow.objects.filter(user_id=user_id)
+                        .values_list('author_id', flat=True))
+        cache.set(key, ids, cache_timeout(settings.FOLLOWING_CACHE_TIMEOUT))
+    return ids
+
+
+def forget_following(user_ids):
+    cache.delete_many([FOLLOWING_KEY.format(user_id)
+                       for user_id in set(user_ids)])
+
+
+class FollowState:
+    """Подписки зрителя на время запроса: `author in follow_state`."""
+
+    def __init__(self, user):
+        self.user = user
+        self._ids = None
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = (following_ids(self.user.pk)
+                         if self.user.is_authenticated else frozenset())
+        return self._ids
+
+    def __contains__(self, author):
+        return getattr(author, 'pk', author) in self.ids
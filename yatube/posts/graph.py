@@ -0,0 +1,244 @@
+"""Граф подписок в памяти процесса.
+
+Для каждого пользователя хранятся отсортированные массивы id тех, на
+кого он подписан, и его подписчиков (array('q') — 8 байт на ребро без
+объектов Python). Граф включается настройкой FOLLOW_GRAPH и требует
+общего кеша (memcached, redis): после коммита каждое изменение получает
+новую версию GRAPH_SCOPE (см. posts.changes) и кладётся в кеш под её
+номером, а все процессы, включая записавший, догоняют версию, применяя
+записи журнала по порядку.
+
+Целиком граф читается из базы только в фоновом потоке: при первом
+обращении или если записи журнала пропали из кеша. До конца загрузки
+get_graph() отдаёт прежнюю копию или None, и функции модуля отвечают
+запросами к базе. Чтения и изменения идут под одной блокировкой.
+"""
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Subquery
+
+from .changes import bump_scope, scope_version
+from .models import Follow
+
+logger = logging.getLogger(__name__)
+
+GRAPH_SCOPE = 'follow-graph'
+LOG_KEY = 'posts:follow-graph:{}'
+LOG_TIMEOUT = 60 * 60
+# Больше записей не догоняем, а перечитываем граф.
+MAX_CATCH_UP = 1000
+# Сколько ждать запись, которую писатель ещё не успел положить в кеш.
+LOG_GRACE = 5
+EMPTY = array('q')
+
+
+def _insert(values, value):
+    index = bisect_left(values, value)
+    if index == len(values) or values[index] != value:
+        values.insert(index, value)
+
+
+def _discard(values, value):
+    index = bisect_left(values, value)
+    if index < len(values) and values[index] == value:
+        del values[index]
+
+
+def _intersect(first, second):
+    """Пересечение отсортированных массивов слиянием."""
+    result = []
+    i = j = 0
+    while i < len(first) and j < len(second):
+        if first[i] < second[j]:
+            i += 1
+        elif first[i] > second[j]:
+            j += 1
+        else:
+            result.append(first[i])
+            i += 1
+            j += 1
+    return result
+
+
+class FollowGraph:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loader = None
+        self._missing = None
+        self.version = None
+        self.following = {}
+        self.followers = {}
+
+    def load(self, version=None):
+        following = {}
+        followers = {}
+        rows = (Follow.objects.order_by('user_id', 'author_id')
+                .values_list('user_id', 'author_id')
+                .iterator(chunk_size=10000))
+        for user_id, author_id in rows:
+            following.setdefault(user_id, array('q')).append(author_id)
+            followers.setdefault(author_id, array('q')).append(user_id)
+        # Подписчики приходят в порядке user_id, то есть уже отсортированы.
+        with self._lock:
+            self.following = following
+            self.followers = followers
+            self.version = version
+            self._missing = None
+
+    def load_in_background(self):
+        with self._lock:
+            if self._loader is not None and self._loader.is_alive():
+                return
+            self._loader = threading.Thread(target=self._load_latest,
+                                            daemon=True)
+            self._loader.start()
+
+    def _load_latest(self):
+        try:
+            # Версия берётся до чтения таблицы: изменения, закоммиченные
+            # во время загрузки, применятся повторно, а это безопасно.
+            self.load(scope_version(GRAPH_SCOPE))
+        except Exception:
+            logger.exception('Follow graph load failed')
+        finally:
+            connections.close_all()
+
+    def _add(self, user_id, author_id):
+        _insert(self.following.setdefault(user_id, array('q')), author_id)
+        _insert(self.followers.setdefault(author_id, array('q')), user_id)
+
+    def _remove(self, user_id, author_id):
+        _discard(self.following.get(user_id, EMPTY), author_id)
+        _discard(self.followers.get(author_id, EMPTY), user_id)
+
+    def add(self, user_id, author_id):
+        with self._lock:
+            self._add(user_id, author_id)
+
+    def remove(self, user_id, author_id):
+        with self._lock:
+            self._remove(user_id, author_id)
+
+    def following_count(self, user_id):
+        with self._lock:
+            return len(self.following.get(user_id, EMPTY))
+
+    def followers_count(self, user_id):
+        with self._lock:
+            return len(self.followers.get(user_id, EMPTY))
+
+    def is_following(self, user_id, author_id):
+        with self._lock:
+            values = self.following.get(user_id, EMPTY)
+            index = bisect_left(values, author_id)
+            return index < len(values) and values[index] == author_id
+
+    def mutual(self, user_id):
+        """Взаимные подписки пользователя."""
+        with self._lock:
+            return _intersect(self.following.get(user_id, EMPTY),
+                              self.followers.get(user_id, EMPTY))
+
+    def followed_by_following(self, viewer_id, author_id):
+        """Кто из тех, на кого подписан viewer, читает author."""
+        with self._lock:
+            return _intersect(self.following.get(viewer_id, EMPTY),
+                              self.followers.get(author_id, EMPTY))
+
+    def catch_up(self, version):
+        """Применяет журнал до version.
+
+        Возвращает False, если граф не загружен или записи журнала
+        пропали и его надо перечитать.
+        """
+        start = self.version
+        if start is None or version - start > MAX_CATCH_UP:
+            return False
+        if start >= version:
+            return True
+        entries = cache.get_many([LOG_KEY.format(number)
+                                  for number in range(start + 1,
+                                                      version + 1)])
+        with self._lock:
+            if self.version is None:
+                return False
+            for number in range(self.version + 1, version + 1):
+                entry = entries.get(LOG_KEY.format(number))
+                if entry is None:
+                    return self._wait_for(number)
+                op, user_id, author_ids = entry
+                change = self._add if op == 'add' else self._remove
+                for author_id in author_ids:
+                    change(user_id, author_id)
+                self.version = number
+            self._missing = None
+        return True
+
+    def _wait_for(self, number):
+        # Писатель мог уже увеличить версию, но ещё не положить запись.
+        now = time.monotonic()
+        if self._missing is None or self._missing[0] != number:
+            self._missing = (number, now)
+        return now - self._missing[1] < LOG_GRACE
+
+    def apply(self, op, user_id, author_id):
+        self.apply_many(op, user_id, [author_id])
+
+    def apply_many(self, op, user_id, author_ids):
+        """Изменения одного пользователя под одной новой версией.
+
+        op — 'add' или 'remove'.
+        """
+        if not settings.FOLLOW_GRAPH:
+            return
+        version = bump_scope(GRAPH_SCOPE)
+        cache.set(LOG_KEY.format(version), (op, user_id, list(author_ids)),
+                  LOG_TIMEOUT)
+        self.catch_up(version)
+
+
+graph = FollowGraph()
+
+
+def get_graph():
+    """Граф, догнавший общую версию, или None, пока он не загружен.
+
+    Загрузка идёт в фоновом потоке, а запрос тем временем обходится
+    базой.
+    """
+    if not settings.FOLLOW_GRAPH:
+        return None
+    if graph.catch_up(scope_version(GRAPH_SCOPE)):
+        return graph
+    graph.load_in_background()
+    return graph if graph.version is not None else None
+
+
+def is_following(user_id, author_id):
+    current = get_graph()
+    if current is not None:
+        return current.is_following(user_id, author_id)
+    return Follow.objects.filter(user_id=user_id,
+                                 author_id=author_id).exists()
+
+
+def followed_by_following(viewer_id, author_id, limit):
+    """Первые limit читателей author среди подписок viewer и их число."""
+    current = get_graph()
+    if current is not None:
+        readers = current.followed_by_following(viewer_id, author_id)
+        return readers[:limit], len(readers)
+    readers = Follow.objects.filter(
+        author_id=author_id,
+        user_id__in=Subquery(Follow.objects.filter(user_id=viewer_id)
+                             .values('author_id')),
+    ).order_by('user_id').values_list('user_id', flat=True)
+    first = list(readers[:limit])
+    return first, readers.count() if first else 0
@@ -0,0 +1,98 @@
+"""Поток Server-Sent Events о новых постах в ленте.
+
+Пока лента не меняется, цикл только читает из кеша её версию (см.
+posts.changes) и изредка шлёт keepalive. Когда версия меняется,
+выполняется один запрос по первичному ключу: сколько постов новее
+последнего увиденного клиентом. Поток живёт не дольше
+LIVE_MAX_DURATION секунд, после чего EventSource переподключается сам
+и передаёт Last-Event-ID. Версии лент хранятся в кеше, поэтому при
+нескольких воркерах нужен общий бэкенд кеша (memcached, redis).
+
+Пока поток открыт, он занимает воркер: синхронный воркер gunicorn
+простаивает до LIVE_MAX_DURATION секунд на каждого клиента. Отдавать
+поток нужно асинхронным воркером (gevent, eventlet) или ASGI-сервером.
+"""
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db.models import Max
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from .changes import INDEX_SCOPE, group_scope, new_posts, scope_version
+from .models import Group, Post
+
+RETRY_MS = 5000
+
+
+def _event(name, since, data):
+    return (f'id: {since}\nevent: {name}\n'
+            f'data: {json.dumps(data)}\n\n')
+
+
+def event_stream(scope, queryset, since):
+    deadline = time.monotonic() + settings.LIVE_MAX_DURATION
+    last_sent = time.monotonic()
+    version = None
+    yield f'retry: {RETRY_MS}\n\n'
+    while True:
+        current = scope_version(scope)
+        now = time.monotonic()
+        if current != version:
+            version = current
+            result = new_posts(queryset, since)
+            if result['count']:
+                last_sent = now
+                # id остаётся равным since: после переподключения
+                # клиент всё ещё не видел этих постов.
+                yield _event('new-posts', since, result)
+        if now - last_sent >= settings.LIVE_KEEPALIVE:
+            last_sent = now
+            yield ': keepalive\n\n'
+        if now >= deadline:
+            return
+        time.sleep(settings.LIVE_POLL_INTERVAL)
+
+
+def _stream_response(request, scope, queryset):
+    since = request.GET.get('since') or request.META.get(
+        'HTTP_LAST_EVENT_ID')
+    if since is None:
+        since = Post.objects.aggregate(latest=Max('pk'))['latest'] or 0
+    try:
+        since = int(since)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid since')
+    response = StreamingHttpResponse(
+        event_stream(scope, queryset, since),
+        content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Не даём nginx буферизовать поток.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_safe
+def index(request):
+    return _stream_response(request, INDEX_SCOPE, Post.objects.all())
+
+
+@require_safe
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _stream_response(request, group_scope(group.slug),
+                            group.posts.all())
+
+
+@require_safe
+@login_required
+def follow_index(request):
+    # Отдельные версии по каждому автору пришлось бы читать на каждом
+    # шаге, поэтому лента подписок следит за общей версией и считает
+    # только посты авторов, на которых подписан пользователь.
+    return _stream_response(
+        request, INDEX_SCOPE,
+        Post.objects.filter(author__following__user=request.user))
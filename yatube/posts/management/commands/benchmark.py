@@ -0,0 +1,215 @@
+import json
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count, Max
+from django.test import Client
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from core.db.queries import count_queries
+from posts import urls as posts_urls
+from posts.models import Comment, Post, User
+from posts.sitemaps import build_sitemaps
+
+# Адреса, которые подписывают и отписывают, не замеряются.
+WRITE_ROUTES = {'profile_follow', 'profile_unfollow', 'api_follow_bulk'}
+# Адреса, которым нужен id последнего увиденного поста.
+SINCE_ROUTES = {'api_index_new', 'api_group_new', 'api_profile_new',
+                'api_follow_new', 'live_index', 'live_group', 'live_follow'}
+# Насколько since отстаёт от последнего поста.
+SINCE_LAG = 10
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def sample_kwargs():
+    post = (Post.objects.select_related('author', 'group')
+            .filter(group__isnull=False).first())
+    if post is None:
+        raise CommandError('No posts with a group, run generate_data first')
+    return {
+        'post_id': post.pk,
+        'comment_id': reply_thread(post).pk,
+        'slug': post.group.slug,
+        'username': post.author.username,
+        'filename': 'posts-0.xml',
+    }
+
+
+def reply_thread(post):
+    """Комментарий поста с ответами; generate_data создаёт только корни."""
+    comment = post.comments.order_by('-reply_count').first()
+    if comment is None or not comment.reply_count:
+        comment = comment or Comment.objects.create(
+            post=post, author=post.author, text='Комментарий для замера')
+        Comment.objects.create(post=post, author=post.author,
+                               parent=comment, text='Ответ для замера')
+    return comment
+
+
+def benchmark_urls():
+    """Адреса для замера с данными, на которых они отвечают успешно."""
+    kwargs = sample_kwargs()
+    build_sitemaps()
+    latest = Post.objects.aggregate(latest=Max('pk'))['latest']
+    query = urlencode({'since': max(latest - SINCE_LAG, 0)})
+    urls = {}
+    for pattern in posts_urls.urlpatterns:
+        if pattern.name in WRITE_ROUTES:
+            continue
+        names = pattern.pattern.converters.keys()
+        urls[pattern.name] = reverse(
+            f'{posts_urls.app_name}:{pattern.name}',
+            kwargs={name: kwargs[name] for name in names},
+        )
+        if pattern.name in SINCE_ROUTES:
+            urls[pattern.name] += f'?{query}'
+    return urls
+
+
+def failed_statuses(samples):
+    """Ответы с кодом не из 2xx и 3xx: такой замер не сравним."""
+    statuses = {}
+    for sample in samples:
+        if not 200 <= sample[2] < 400:
+            statuses[str(sample[2])] = statuses.get(str(sample[2]), 0) + 1
+    return statuses
+
+
+def run_client(url, requests, user):
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    samples = []
+    try:
+        for _ in range(requests):
+            with count_queries() as counter:
+                start = time.perf_counter()
+                response = client.get(url)
+                elapsed = time.perf_counter() - start
+            response.close()
+            samples.append((elapsed, counter.count, response.status_code))
+    finally:
+        connections.close_all()
+    return samples
+
+
+def summarize(url, samples, wall_time):
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    statuses = {}
+    for sample in samples:
+        statuses[str(sample[2])] = statuses.get(str(sample[2]), 0) + 1
+    return {
+        'url': url,
+        'requests': len(samples),
+        'rps': round(len(samples) / wall_time, 2) if wall_time else None,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'queries_per_request': round(
+            sum(sample[1] for sample in samples) / len(samples), 2),
+        'statuses': statuses,
+    }
+
+
+class Command(BaseCommand):
+    help = ('Нагружает все адреса posts/urls.py параллельными клиентами '
+            'и сохраняет задержки, RPS и число запросов к БД в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=4)
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Число запросов к каждому адресу от каждого клиента',
+        )
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument(
+            '--compare', metavar='BASELINE',
+            help='Сравнить результат с сохранённым ранее JSON',
+        )
+        parser.add_argument(
+            '--url', action='append', dest='only',
+            help='Имя маршрута для замера (можно повторять)',
+        )
+
+    def handle(self, *args, **options):
+        user = (User.objects.annotate(following_count=Count('follower'))
+                .order_by('-following_count').first())
+        urls = benchmark_urls()
+        if options['only']:
+            unknown = set(options['only']) - urls.keys()
+            if unknown:
+                raise CommandError(
+                    f'Unknown or write routes: {", ".join(sorted(unknown))}')
+            urls = {name: urls[name] for name in options['only']}
+
+        results = {}
+        failed = {}
+        with ThreadPoolExecutor(options['clients']) as executor:
+            for name, url in urls.items():
+                start = time.perf_counter()
+                futures = [
+                    executor.submit(run_client, url, options['requests'],
+                                    user)
+                    for _ in range(options['clients'])
+                ]
+                samples = [s for future in futures for s in future.result()]
+                errors = failed_statuses(samples)
+                if errors:
+                    failed[name] = {'url': url, 'statuses': errors}
+                    self.stderr.write(f'{name:<20} FAILED {errors}')
+                    continue
+                results[name] = summarize(url, samples,
+                                          time.perf_counter() - start)
+                self.stdout.write(
+                    f'{name:<20} p50={results[name]["p50_ms"]}ms '
+                    f'p95={results[name]["p95_ms"]}ms '
+                    f'rps={results[name]["rps"]} '
+                    f'queries={results[name]["queries_per_request"]}'
+                )
+
+        report = {
+            'meta': {
+                'clients': options['clients'],
+                'requests_per_client': options['requests'],
+                'debug': settings.DEBUG,
+                'database': connections['default'].vendor,
+                'python': platform.python_version(),
+                'posts': Post.objects.count(),
+                'users': User.objects.count(),
+            },
+            'urls': results,
+            'failed': failed,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+        if options['compare']:
+            self.compare(results, options['compare'])
+        if failed:
+            raise CommandError(
+                f'Failed routes: {", ".join(sorted(failed))}')
+
+    def compare(self, results, baseline_path):
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)['urls']
+        for name, current in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            self.stdout.write(
+                f'{name:<20} '
+                f'p95 {previous["p95_ms"]} -> {current["p95_ms"]}ms, '
+                f'rps {previous["rps"]} -> {current["rps"]}, '
+                f'queries {previous["queries_per_request"]} -> '
+                f'{current["queries_per_request"]}'
+            )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.sitemaps import build_sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Обновляет файлы карты сайта, переписывая только изменённые куски'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Переписать все файлы, даже если данные не менялись',
+        )
+
+    def handle(self, *args, **options):
+        written = build_sitemaps(force=options['force'])
+        for filename in written:
+            self.stdout.write(f'updated {filename}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Sitemaps are up to date ({len(written)} files written)'))
@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from posts.models import Post
+
+FIELDS = ('id', 'text', 'pub_date', 'author__username', 'group__slug',
+          'image')
+
+
+class Command(BaseCommand):
+    help = ('Выгружает посты в JSON Lines. На PostgreSQL строки читаются '
+            'серверным курсором, поэтому память не растёт с размером базы')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Файл, по умолчанию stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rows = (
+            Post.objects.order_by('pk')
+            .values(*FIELDS)
+            .iterator(chunk_size=options['chunk_size'])
+        )
+        output = (open(options['output'], 'w') if options['output']
+                  else self.stdout)
+        count = 0
+        try:
+            for row in rows:
+                output.write(json.dumps(row, cls=DjangoJSONEncoder,
+                                        ensure_ascii=False) + '\n')
+                count += 1
+        finally:
+            if options['output']:
+                output.close()
+        self.stderr.write(f'Выгружено постов: {count}')
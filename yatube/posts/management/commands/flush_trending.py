@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import flush_views
+
+
+class Command(BaseCommand):
+    help = ('Переносит накопленные в кеше просмотры в оценки популярного; '
+            'запускайте по расписанию раз в минуту')
+
+    def handle(self, *args, **options):
+        count = flush_views()
+        self.stdout.write(f'Учтено просмотров: {count}')
@@ -0,0 +1,142 @@
+import io
+import random
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections, router, transaction
+from faker import Faker
+from mixer.backend.django import mixer
+from PIL import Image
+
+from posts import counters
+from posts.models import Comment, Follow, Group, Post, User, root_path
+
+
+def power_law_weights(size, exponent):
+    """Веса по закону Ципфа: немногие получают большую часть активности."""
+    weights = [1 / (rank + 1) ** exponent for rank in range(size)]
+    random.shuffle(weights)
+    return weights
+
+
+def bench_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (960, 339), color=(135, 206, 250)).save(buffer, 'PNG')
+    return default_storage.save('posts/bench.png',
+                                ContentFile(buffer.getvalue()))
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу данными для нагрузочного тестирования'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Среднее число подписок на пользователя',
+        )
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.2,
+            help='Доля постов с картинкой',
+        )
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='Показатель степенного распределения активности',
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            help='Размер пакета вставки, не больше допустимого базой',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        Faker.seed(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.batch_size = options['batch_size']
+        prefix = f'bench{User.objects.count()}_'
+
+        with transaction.atomic():
+            users = mixer.cycle(options['users']).blend(
+                User,
+                username=mixer.sequence(lambda i: f'{prefix}{i}'),
+            )
+            groups = mixer.cycle(options['groups']).blend(
+                Group,
+                slug=mixer.sequence(lambda i: f'{prefix}group-{i}'),
+            )
+        weights = power_law_weights(len(users), options['exponent'])
+
+        self.create_posts(users, weights, groups, options)
+        # SQLite не возвращает pk из bulk_create, поэтому id перечитываются.
+        post_ids = list(
+            Post.objects.filter(author__username__startswith=prefix)
+            .values_list('pk', flat=True)
+        )
+        self.create_follows(users, weights, options['follows'])
+        self.create_comments(users, post_ids, options)
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(users)} users, {len(groups)} groups, '
+            f'{len(post_ids)} posts'
+        ))
+
+    def bulk_create(self, model, objs, **kwargs):
+        # SQLite ограничивает число строк и параметров в одной вставке.
+        objs = list(objs)
+        fields = [field for field in model._meta.concrete_fields
+                  if not field.primary_key]
+        ops = connections[router.db_for_write(model)].ops
+        limit = max(ops.bulk_batch_size(fields, objs), 1)
+        model.objects.bulk_create(
+            objs, batch_size=min(self.batch_size or limit, limit), **kwargs)
+
+    def create_posts(self, users, weights, groups, options):
+        image = bench_image() if options['image_ratio'] > 0 else None
+        authors = random.choices(users, weights, k=options['posts'])
+        posts = []
+        for author in authors:
+            post = Post(
+                author=author,
+                text=self.fake.text(max_nb_chars=random.randint(80, 800)),
+            )
+            if groups and random.random() < 0.7:
+                post.group = random.choice(groups)
+            if random.random() < options['image_ratio']:
+                post.image = image
+            posts.append(post)
+        self.bulk_create(Post, posts)
+
+    def create_follows(self, users, weights, average):
+        follows = []
+        for user in users:
+            count = min(int(random.expovariate(1 / average)), len(users) - 1)
+            authors = set(random.choices(users, weights, k=count))
+            authors.discard(user)
+            follows.extend(Follow(user=user, author=author)
+                           for author in authors)
+        self.bulk_create(Follow, follows, ignore_conflicts=True)
+        counters.rebuild()
+
+    def create_comments(self, users, post_ids, options):
+        if not post_ids:
+            return
+        post_weights = power_law_weights(len(post_ids), options['exponent'])
+        targets = random.choices(post_ids, post_weights,
+                                 k=options['comments'])
+        self.bulk_create(
+            Comment,
+            (
+                Comment(
+                    post_id=post_id,
+                    author=random.choice(users),
+                    text=self.fake.sentence(nb_words=random.randint(3, 30)),
+                )
+                for post_id in targets
+            ),
+        )
+        # bulk_create обходит Comment.save(), пути корней ставим здесь.
+        Comment.objects.filter(path='').update(path=root_path())
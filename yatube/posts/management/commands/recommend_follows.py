@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import RecommendationQueue, User
+from posts.recommendations import TOP_K, mark_dirty, refresh_queued
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации «кого почитать» для пользователей, '
+            'чьи подписки менялись с прошлого запуска')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Поставить в очередь всех пользователей')
+        parser.add_argument('--top', type=int, default=TOP_K)
+
+    def handle(self, *args, **options):
+        if options['all']:
+            mark_dirty(User.objects.values_list('pk', flat=True))
+        queued = RecommendationQueue.objects.count()
+        count = refresh_queued(options['top'])
+        self.stdout.write(f'В очереди: {queued}, пересчитано: {count}')
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+# Индексы, которых нет в других СУБД: компактный BRIN по дате (посты
+# вставляются в порядке pub_date) и частичные индексы для лент постов
+# с картинками и постов в группах.
+POSTGRES_INDEXES = {
+    'post_pub_date_brin': 'USING brin (pub_date)',
+    'post_image_pub_date_idx': (
+        "(pub_date DESC, id DESC) "
+        "WHERE image IS NOT NULL AND image <> ''"
+    ),
+    'post_in_group_pub_date_idx': (
+        '(pub_date DESC, id DESC) WHERE group_id IS NOT NULL'
+    ),
+}
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = apps.get_model('posts', 'Post')._meta.db_table
+    for name, definition in POSTGRES_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} {definition}')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in POSTGRES_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
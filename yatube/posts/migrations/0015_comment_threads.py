@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:55
+
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, LPad
+import django.db.models.deletion
+
+
+def fill_root_paths(apps, schema_editor):
+    # Все существующие комментарии — корни веток.
+    Comment = apps.get_model('posts', 'Comment')
+    Comment.objects.filter(path='').update(
+        path=LPad(Cast('id', CharField()), 10, Value('0')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_postgres_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.Comment', verbose_name='Ответ на'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=250),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Ответов в ветке'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'depth', 'created', 'id'], name='comment_post_depth_idx'),
+        ),
+        migrations.RunPython(fill_root_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:31
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    FollowCounter = apps.get_model('posts', 'FollowCounter')
+    followers = dict(Follow.objects.values('author_id')
+                     .annotate(count=Count('id'))
+                     .values_list('author_id', 'count'))
+    following = dict(Follow.objects.values('user_id')
+                     .annotate(count=Count('id'))
+                     .values_list('user_id', 'count'))
+    FollowCounter.objects.bulk_create(
+        [FollowCounter(user_id=user_id,
+                       followers=followers.get(user_id, 0),
+                       following=following.get(user_id, 0))
+         for user_id in followers.keys() | following.keys()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0018_trending_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FollowCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('followers', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,40 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Cast, LPad
 
 User = get_user_model()
 
+# Путь комментария — pk всех предков и его собственный, каждый дополнен
+# нулями до PATH_STEP цифр. Сортировка по пути даёт обход дерева в
+# глубину, а поддерево занимает непрерывный диапазон путей.
+PATH_STEP = 10
+COMMENT_MAX_DEPTH = 24
+
+
+def path_segment(pk):
+    return f'{pk:0{PATH_STEP}d}'
+
+
+def root_path():
+    """Выражение пути корневого комментария для bulk_create и update()."""
+    return LPad(Cast('pk', CharField()), PATH_STEP, Value('0'))
+
+
+def ancestor_ids(path):
+    return [int(path[start:start + PATH_STEP])
+            for start in range(0, len(path) - PATH_STEP, PATH_STEP)]
+
+
+def subtree_bounds(path):
+    """Границы (path, следующий сосед) поддерева без самого узла.
+
+    Пути состоят только из цифр, поэтому диапазон одинаково работает
+    при любой сортировке строк в базе и использует обычный индекс.
+    """
+    last = int(path[-PATH_STEP:])
+    return path, path[:-PATH_STEP] + path_segment(last + 1)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200, verbose_name="Группа")
@@ -37,6 +69,14 @@ class Post(models.Model):
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_pub_date_id_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_pub_date_idx'),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -55,6 +95,41 @@ class Comment(models.Model):
                                )
     text = models.TextField(verbose_name='Комментарий')
     created = models.DateTimeField(auto_now_add=True)
+    parent = models.ForeignKey('self',
+                               blank=True,
+                               null=True,
+                               on_delete=models.CASCADE,
+                               related_name='replies',
+                               verbose_name='Ответ на'
+                               )
+    path = models.CharField(max_length=PATH_STEP * (COMMENT_MAX_DEPTH + 1),
+                            default='', editable=False, db_index=True)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    reply_count = models.PositiveIntegerField(
+        'Ответов в ветке', default=0, editable=False)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('post', 'depth', 'created', 'id'),
+                         name='comment_post_depth_idx'),
+        )
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        # Слишком глубокий ответ становится соседом родителя.
+        if self.parent and self.parent.depth >= COMMENT_MAX_DEPTH:
+            self.parent = self.parent.parent
+        self.depth = self.parent.depth + 1 if self.parent else 0
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            prefix = self.parent.path if self.parent else ''
+            self.path = prefix + path_segment(self.pk)
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+            if self.parent:
+                Comment.objects.filter(
+                    pk__in=ancestor_ids(self.path)
+                ).update(reply_count=F('reply_count') + 1)
 
 
 class Follow(models.Model):
@@ -73,3 +148,82 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = ('user', 'author')
+        # Списки подписчиков и подписок листаются по ключу -id.
+        indexes = (
+            models.Index(fields=('author', '-id'),
+                         name='follow_author_id_idx'),
+            models.Index(fields=('user', '-id'),
+                         name='follow_user_id_idx'),
+        )
+
+
+class FollowCounter(models.Model):
+    """Число подписчиков и подписок пользователя (см. posts.counters)."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Пользователь',
+    )
+    followers = models.PositiveIntegerField('Подписчиков', default=0)
+    following = models.PositiveIntegerField('Подписок', default=0)
+
+
+class Recommendation(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        verbose_name='Пользователь',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рекомендуемый автор',
+    )
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        unique_together = ('user', 'author')
+        indexes = (
+            models.Index(fields=('user', '-score'),
+                         name='recommendation_user_score_idx'),
+        )
+
+
+class RecommendationQueue(models.Model):
+    """Пользователи, чьи подписки менялись с прошлого пересчёта."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Пользователь',
+    )
+    queued = models.DateTimeField(auto_now=True)
+
+
+class PostScore(models.Model):
+    """Оценка популярности поста в логарифмической шкале (см. trending)."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Пост',
+    )
+    score = models.FloatField('Оценка', db_index=True)
+
+
+class GroupScore(models.Model):
+    """Оценка популярности группы в логарифмической шкале."""
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Группа',
+    )
+    score = models.FloatField('Оценка', db_index=True)
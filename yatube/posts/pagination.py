@@ -0,0 +1,97 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# Порядок лент постов; pk делает его однозначным при равных датах.
+FEED_ORDERING = ('-pub_date', '-pk')
+COMMENT_ORDERING = ('created', 'pk')
+FOLLOW_ORDERING = ('-pk',)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPaginator:
+    """Пагинация по ключу (keyset) вместо OFFSET.
+
+    Страница выбирается условием на поля сортировки, поэтому стоимость
+    запроса не зависит от глубины листания.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = ordering
+        self.per_page = per_page
+        self.fields = [name.lstrip('-') for name in ordering]
+
+    def _model_field(self, name):
+        opts = self.queryset.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    @staticmethod
+    def _key_value(obj, name):
+        if isinstance(obj, dict):
+            return obj['id' if name == 'pk' else name]
+        return getattr(obj, name)
+
+    def encode_cursor(self, obj):
+        values = []
+        for name in self.fields:
+            value = self._key_value(obj, name)
+            values.append(value.isoformat()
+                          if hasattr(value, 'isoformat') else value)
+        raw = json.dumps(values).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+            if len(values) != len(self.fields):
+                raise ValueError
+            return [self._model_field(name).to_python(value)
+                    for name, value in zip(self.fields, values)]
+        except (TypeError, ValueError, ValidationError) as error:
+            raise InvalidCursor(cursor) from error
+
+    def _after(self, values):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            term = Q(**{f'{field}__{lookup}': values[index]})
+            for prev in range(index):
+                term &= Q(**{self.fields[prev]: values[prev]})
+            condition |= term
+        return condition
+
+    def page(self, cursor=None):
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode_cursor(cursor)))
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        object_list = rows[:self.per_page]
+        next_cursor = (self.encode_cursor(object_list[-1])
+                       if has_next else None)
+        return KeysetPage(object_list, next_cursor)
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
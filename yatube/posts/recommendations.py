@@ -0,0 +1,200 @@
+"""Рекомендации «кого почитать».
+
+Кандидаты оцениваются по окрестности пользователя в графе подписок:
+- друзья друзей — авторы, которых читают те, кого читает пользователь;
+- совместные подписки — авторы, которых читают другие подписчики тех
+  же авторов, с весом, убывающим с популярностью общего автора;
+- общие группы — авторы, пишущие в тех же группах, что и авторы из
+  подписок.
+Окрестность читается из базы для каждой пачки пользователей, и на каждом
+шаге берутся только последние MAX_FANOUT подписок и MAX_CO_FOLLOWERS
+подписчиков: выборка детерминирована и не растёт с популярностью
+авторов. Пересчитываются только пользователи из RecommendationQueue и
+не больше MAX_REFRESHED_FOLLOWERS их подписчиков, у которых поменялся
+круг друзей друзей.
+"""
+import heapq
+import math
+from collections import Counter, defaultdict, namedtuple
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .counters import followers_counts
+from .following import following_ids
+from .models import (Follow, Post, Recommendation, RecommendationQueue,
+                     User)
+
+TOP_K = 10
+FOF_WEIGHT = 1.0
+CO_FOLLOW_WEIGHT = 0.5
+GROUP_WEIGHT = 0.3
+# Сколько соседей смотреть на каждом шаге, чтобы популярные авторы с
+# миллионами подписчиков не делали пересчёт квадратичным.
+MAX_FANOUT = 100
+MAX_CO_FOLLOWERS = 20
+# Сколько подписчиков изменившегося пользователя пересчитывать сразу.
+MAX_REFRESHED_FOLLOWERS = 1000
+BATCH_SIZE = 500
+
+Neighbourhood = namedtuple(
+    'Neighbourhood', 'following sampled co_followers follower_counts')
+
+
+def _chunks(values, size=BATCH_SIZE):
+    values = sorted(set(values))
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def mark_dirty(user_ids):
+    for batch in _chunks(user_ids):
+        # Пользователь мог быть удалён вместе со своими подписками.
+        batch = list(User.objects.filter(pk__in=batch)
+                     .values_list('pk', flat=True))
+        # Уже стоящим в очереди обновляем время, чтобы идущий пересчёт
+        # не снял их из очереди вместе с новым изменением.
+        RecommendationQueue.objects.filter(user_id__in=batch).update(
+            queued=timezone.now())
+        RecommendationQueue.objects.bulk_create(
+            [RecommendationQueue(user_id=user_id) for user_id in batch],
+            ignore_conflicts=True,
+        )
+
+
+def latest_follows(key, value, ids, limit):
+    """Последние limit подписок по каждому из ids: {id: [значения]}.
+
+    key и value — 'user_id' и 'author_id' в том или ином порядке.
+    Порог по id берётся подзапросом по индексу (key, -id), так что
+    строки сверх limit база не читает.
+    """
+    threshold = (Follow.objects.filter(**{key: OuterRef(key)})
+                 .order_by('-id').values('id')[limit - 1:limit])
+    result = defaultdict(list)
+    for batch in _chunks(ids):
+        rows = (Follow.objects.filter(**{f'{key}__in': batch})
+                .filter(id__gte=Coalesce(Subquery(threshold), Value(0)))
+                .order_by(key, value).values_list(key, value))
+        for key_id, value_id in rows:
+            result[key_id].append(value_id)
+    return result
+
+
+def neighbourhood(user_ids):
+    """Окрестность пользователей в графе подписок, прочитанная из базы."""
+    following = defaultdict(set)
+    for user_id, author_id in Follow.objects.filter(
+            user_id__in=user_ids).values_list('user_id', 'author_id'):
+        following[user_id].add(author_id)
+    sampled = latest_follows('user_id', 'author_id', user_ids, MAX_FANOUT)
+    friends = set().union(*sampled.values())
+    co_followers = latest_follows('author_id', 'user_id', friends,
+                                  MAX_CO_FOLLOWERS)
+    others = set().union(*co_followers.values())
+    sampled.update(latest_follows(
+        'user_id', 'author_id', (friends | others) - set(user_ids),
+        MAX_FANOUT))
+    follower_counts = {}
+    for batch in _chunks(friends):
+        follower_counts.update(followers_counts(batch))
+    return Neighbourhood(following, sampled, co_followers, follower_counts)
+
+
+def group_index(author_ids):
+    """Группы авторов из подписок и авторы этих групп."""
+    author_groups = defaultdict(set)
+    for author_id, group_id in (
+        Post.objects.filter(author_id__in=author_ids, group__isnull=False)
+        .values_list('author_id', 'group_id').distinct()
+    ):
+        author_groups[author_id].add(group_id)
+    group_ids = set().union(*author_groups.values())
+    group_authors = defaultdict(set)
+    for group_id, author_id in (
+        Post.objects.filter(group_id__in=group_ids)
+        .values_list('group_id', 'author_id').distinct()
+    ):
+        group_authors[group_id].add(author_id)
+    return author_groups, group_authors
+
+
+def score_candidates(area, user_id, author_groups, group_authors,
+                     top=TOP_K):
+    scores = Counter()
+    groups = set()
+    for friend in area.sampled.get(user_id, ()):
+        for candidate in area.sampled.get(friend, ()):
+            scores[candidate] += FOF_WEIGHT
+        weight = CO_FOLLOW_WEIGHT / math.log2(
+            2 + area.follower_counts.get(friend, 0))
+        for other in area.co_followers.get(friend, ()):
+            for candidate in area.sampled.get(other, ()):
+                scores[candidate] += weight
+        groups |= author_groups.get(friend, set())
+    for group_id in groups:
+        authors = group_authors[group_id]
+        weight = GROUP_WEIGHT / math.log2(2 + len(authors))
+        for candidate in authors:
+            scores[candidate] += weight
+    following = area.following.get(user_id, set())
+    candidates = (
+        (candidate, score) for candidate, score in scores.items()
+        if candidate != user_id and candidate not in following
+    )
+    # При равных оценках порядок задаёт id, а не порядок обхода.
+    return heapq.nlargest(top, candidates,
+                          key=lambda item: (item[1], -item[0]))
+
+
+def refresh(user_ids, top=TOP_K):
+    """Пересчитывает рекомендации пользователей пачками."""
+    count = 0
+    for batch in _chunks(user_ids):
+        count += len(batch)
+        area = neighbourhood(batch)
+        friends = set().union(*(area.sampled.get(user_id, ())
+                                for user_id in batch))
+        author_groups, group_authors = group_index(friends)
+        rows = [
+            Recommendation(user_id=user_id, author_id=author_id,
+                           score=score)
+            for user_id in batch
+            for author_id, score in score_candidates(
+                area, user_id, author_groups, group_authors, top)
+        ]
+        with transaction.atomic():
+            Recommendation.objects.filter(user_id__in=batch).delete()
+            Recommendation.objects.bulk_create(rows)
+    return count
+
+
+def refresh_queued(top=TOP_K):
+    """Пересчёт по очереди: её пользователи и их последние подписчики."""
+    started = timezone.now()
+    dirty = list(RecommendationQueue.objects.filter(queued__lte=started)
+                 .values_list('user_id', flat=True))
+    affected = set(dirty)
+    for batch in _chunks(dirty):
+        for followers in latest_follows('author_id', 'user_id', batch,
+                                        MAX_REFRESHED_FOLLOWERS).values():
+            affected.update(followers)
+    count = refresh(affected, top)
+    # Записи, обновлённые во время пересчёта, останутся до следующего.
+    for batch in _chunks(dirty):
+        RecommendationQueue.objects.filter(user_id__in=batch,
+                                           queued__lte=started).delete()
+    return count
+
+
+def recommendations_for(user, limit=5):
+    """Готовые рекомендации без тех, на кого уже подписался."""
+    if not user.is_authenticated:
+        return []
+    following = following_ids(user.pk)
+    rows = (Recommendation.objects.filter(user=user)
+            .select_related('author').order_by('-score')[:limit * 2])
+    return [row.author for row in rows
+            if row.author_id not in following][:limit]
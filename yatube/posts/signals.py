@@ -0,0 +1,93 @@
+import threading
+from collections import Counter, defaultdict
+
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import trending
+from .changes import GROUPS_SCOPE, bump_scopes, group_scope, post_scopes
+from .models import Comment, Follow, Group, Post, ancestor_ids
+from .subscriptions import follows_changed
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_group(sender, instance, raw, **kwargs):
+    instance._previous_group_slug = None
+    if instance.pk and not raw:
+        instance._previous_group_slug = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group__slug', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    scopes = post_scopes(instance)
+    previous_slug = getattr(instance, '_previous_group_slug', None)
+    if previous_slug:
+        scopes.append(group_scope(previous_slug))
+    bump_scopes(scopes)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    bump_scopes([group_scope(instance.slug), GROUPS_SCOPE])
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        trending.record('comment', instance.post_id, instance.post.group_id)
+
+
+# Удаление поста или пользователя каскадом удаляет тысячи комментариев,
+# и сигнал приходит для каждого. Django сначала шлёт pre_delete для всех
+# удаляемых объектов, а post_delete — уже после DELETE, поэтому пути
+# копятся в pre_delete, и первый post_delete пачки уменьшает уцелевших
+# предков одним UPDATE на каждое встретившееся значение разности.
+_deleting = threading.local()
+
+
+@receiver(pre_delete, sender=Comment)
+def comment_deleting(sender, instance, **kwargs):
+    if getattr(_deleting, 'paths', None) is None:
+        _deleting.paths = {}
+    _deleting.paths[instance.pk] = instance.path
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, using, **kwargs):
+    paths = getattr(_deleting, 'paths', None)
+    if paths is None:
+        return
+    _deleting.paths = None
+    comments = Comment.objects.using(using)
+    # Пути упавшего после pre_delete удаления тоже здесь, но эти
+    # комментарии откатились и остались в базе.
+    for pk in comments.filter(pk__in=paths).values_list('pk', flat=True):
+        del paths[pk]
+    lost = Counter(
+        ancestor for path in paths.values()
+        for ancestor in ancestor_ids(path) if ancestor not in paths
+    )
+    by_amount = defaultdict(list)
+    for ancestor, amount in lost.items():
+        by_amount[amount].append(ancestor)
+    for amount, ancestors in by_amount.items():
+        comments.filter(pk__in=ancestors).update(
+            reply_count=F('reply_count') - amount)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        follows_changed(instance.user_id, added=[instance.author_id])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    follows_changed(instance.user_id, removed=[instance.author_id])
@@ -0,0 +1,207 @@
+"""Инкрементальная генерация карты сайта.
+
+Записи разбиваются на куски по диапазонам первичного ключа, а не по
+страницам, поэтому новые и удалённые посты не сдвигают соседние куски.
+Для каждого куска одной группирующей выборкой считается отпечаток
+(количество, сумма pk, последняя дата), и файл переписывается только
+если отпечаток изменился. Если адрес строится из поля (username, slug),
+в отпечаток входит ещё хеш этих полей, чтобы переименование тоже
+переписывало кусок.
+"""
+import hashlib
+import json
+import os
+import re
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, F, Max, Sum
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Group, Post, User
+
+MANIFEST_NAME = 'manifest.json'
+INDEX_NAME = 'sitemap.xml'
+CHUNK_NAME = re.compile(r'(posts|profiles|groups)-\d+\.xml')
+XMLNS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+class Section:
+    def __init__(self, name, queryset, lastmod_field=None):
+        self.name = name
+        self.queryset = queryset
+        self.lastmod_field = lastmod_field
+
+    def fingerprints(self, chunk_size):
+        aggregates = {'count': Count('pk'), 'checksum': Sum('pk')}
+        if self.lastmod_field:
+            aggregates['lastmod'] = Max(self.lastmod_field)
+        rows = (
+            self.queryset
+            .annotate(chunk=F('pk') / chunk_size)
+            .values('chunk')
+            .annotate(**aggregates)
+            .order_by('chunk')
+        )
+        fingerprints = {}
+        for row in rows:
+            chunk = str(row.pop('chunk'))
+            if row.get('lastmod'):
+                row['lastmod'] = row['lastmod'].isoformat()
+            fingerprints[chunk] = row
+        if self.location_fields:
+            for chunk, digest in self.location_digests(chunk_size).items():
+                fingerprints[chunk]['locations'] = digest
+        return fingerprints
+
+    def location_digests(self, chunk_size):
+        digests = {}
+        rows = (
+            self.queryset
+            .order_by('pk')
+            .values_list('pk', *self.location_fields)
+            .iterator(chunk_size=2000)
+        )
+        for row in rows:
+            chunk = str(row[0] // chunk_size)
+            digest = digests.setdefault(chunk, hashlib.md5())
+            digest.update(json.dumps(row).encode())
+        return {chunk: digest.hexdigest()
+                for chunk, digest in digests.items()}
+
+    def filename(self, chunk):
+        return f'{self.name}-{chunk}.xml'
+
+    def entries(self, chunk, chunk_size):
+        start = int(chunk) * chunk_size
+        fields = ['pk'] + self.location_fields
+        if self.lastmod_field:
+            fields.append(self.lastmod_field)
+        rows = (
+            self.queryset
+            .filter(pk__gte=start, pk__lt=start + chunk_size)
+            .order_by('pk')
+            .values_list(*fields)
+            .iterator(chunk_size=2000)
+        )
+        for row in rows:
+            lastmod = row[-1] if self.lastmod_field else None
+            yield self.location(row), lastmod
+
+
+class PostSection(Section):
+    location_fields = []
+
+    def location(self, row):
+        return reverse('posts:post_detail', kwargs={'post_id': row[0]})
+
+
+class ProfileSection(Section):
+    location_fields = ['username']
+
+    def location(self, row):
+        return reverse('posts:profile', kwargs={'username': row[1]})
+
+
+class GroupSection(Section):
+    location_fields = ['slug']
+
+    def location(self, row):
+        return reverse('posts:group_list', kwargs={'slug': row[1]})
+
+
+def get_sections():
+    return [
+        PostSection('posts', Post.objects.all(), 'pub_date'),
+        ProfileSection('profiles', User.objects.filter(is_active=True)),
+        GroupSection('groups', Group.objects.all()),
+    ]
+
+
+def is_sitemap_file(filename):
+    """Отдавать можно только индекс и куски, но не манифест и .tmp."""
+    return filename == INDEX_NAME or bool(CHUNK_NAME.fullmatch(filename))
+
+
+def _write_atomic(path, lines):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as output:
+        output.writelines(lines)
+    os.replace(tmp_path, path)
+
+
+def _urlset(section, chunk, chunk_size, base_url):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<urlset xmlns="{XMLNS}">\n'
+    for location, lastmod in section.entries(chunk, chunk_size):
+        yield f'<url><loc>{escape(base_url + location)}</loc>'
+        if lastmod:
+            yield f'<lastmod>{lastmod.date().isoformat()}</lastmod>'
+        yield '</url>\n'
+    yield '</urlset>\n'
+
+
+def _sitemap_index(manifest, base_url):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<sitemapindex xmlns="{XMLNS}">\n'
+    for section_name, chunks in manifest['sections'].items():
+        for chunk, info in sorted(chunks.items(), key=lambda i: int(i[0])):
+            location = reverse('posts:sitemap_section', kwargs={
+                'filename': f'{section_name}-{chunk}.xml'})
+            yield (f'<sitemap><loc>{escape(base_url + location)}</loc>'
+                   f'<lastmod>{info["written"]}</lastmod></sitemap>\n')
+    yield '</sitemapindex>\n'
+
+
+def _load_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST_NAME)) as manifest:
+            return json.load(manifest)
+    except (OSError, ValueError):
+        return {'sections': {}}
+
+
+def build_sitemaps(force=False):
+    """Обновляет файлы карты сайта и возвращает список переписанных."""
+    root = settings.SITEMAP_ROOT
+    chunk_size = settings.SITEMAP_CHUNK_SIZE
+    base_url = settings.SITEMAP_BASE_URL.rstrip('/')
+    os.makedirs(root, exist_ok=True)
+
+    manifest = _load_manifest(root)
+    if manifest.get('chunk_size') != chunk_size:
+        force = True
+    old_sections = manifest['sections']
+    new_sections = {}
+    written = []
+    today = timezone.now().date().isoformat()
+
+    for section in get_sections():
+        old_chunks = old_sections.get(section.name, {})
+        new_chunks = {}
+        for chunk, fingerprint in section.fingerprints(chunk_size).items():
+            old = old_chunks.get(chunk)
+            path = os.path.join(root, section.filename(chunk))
+            if (force or old is None or old['fingerprint'] != fingerprint
+                    or not os.path.exists(path)):
+                _write_atomic(path, _urlset(section, chunk, chunk_size,
+                                            base_url))
+                written.append(section.filename(chunk))
+                old = {'fingerprint': fingerprint, 'written': today}
+            new_chunks[chunk] = old
+        for chunk in set(old_chunks) - set(new_chunks):
+            path = os.path.join(root, section.filename(chunk))
+            if os.path.exists(path):
+                os.remove(path)
+            written.append(section.filename(chunk))
+        new_sections[section.name] = new_chunks
+
+    manifest = {'chunk_size': chunk_size, 'sections': new_sections}
+    index_path = os.path.join(root, INDEX_NAME)
+    if written or not os.path.exists(index_path):
+        _write_atomic(index_path, _sitemap_index(manifest, base_url))
+        written.append(INDEX_NAME)
+        _write_atomic(os.path.join(root, MANIFEST_NAME),
+                      [json.dumps(manifest, indent=2)])
+    return written
@@ -0,0 +1,98 @@
+"""Подписки и отписки пользователя и их последствия.
+
+Все изменения подписок проходят через follows_changed: его зовут и
+сигналы Follow, и массовые операции. Счётчики и популярность меняются
+в той же транзакции, а кеш подписок, граф и очередь рекомендаций —
+одним пакетом после коммита.
+
+Массовая подписка пишет строки одним bulk_create, который сигналов не
+шлёт, поэтому сообщает об изменении сама. Массовая отписка удаляет
+строки обычным delete(): сигналы post_delete на время удаления
+собираются в один вызов follows_changed.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from . import counters, trending
+from .following import forget_following
+from .graph import graph
+from .models import Follow, FollowCounter, User
+from .recommendations import mark_dirty
+
+_collecting = threading.local()
+
+
+def follows_changed(user_id, added=(), removed=()):
+    """Пользователь подписался на added и отписался от removed."""
+    batch = getattr(_collecting, 'batches', {}).get(user_id)
+    if batch is not None:
+        batch['added'].extend(added)
+        batch['removed'].extend(removed)
+        return
+    added, removed = sorted(added), sorted(removed)
+    if not added and not removed:
+        return
+    counters.count_follows(user_id, added, 1)
+    counters.count_follows(user_id, removed, -1)
+    trending.record_follows(added)
+
+    def apply():
+        forget_following([user_id])
+        if added:
+            graph.apply_many('add', user_id, added)
+        if removed:
+            graph.apply_many('remove', user_id, removed)
+        mark_dirty([user_id])
+
+    transaction.on_commit(apply)
+
+
+@contextmanager
+def collect_changes(user_id):
+    """Копит изменения пользователя из сигналов, чтобы учесть их разом."""
+    batches = _collecting.__dict__.setdefault('batches', {})
+    batch = batches[user_id] = {'added': [], 'removed': []}
+    try:
+        yield batch
+    finally:
+        del batches[user_id]
+    follows_changed(user_id, batch['added'], batch['removed'])
+
+
+def _lock_user(user_id):
+    # Операции одного пользователя идут по очереди, поэтому список
+    # уже существующих подписок не устареет до вставки.
+    FollowCounter.objects.bulk_create([FollowCounter(user_id=user_id)],
+                                      ignore_conflicts=True)
+    list(FollowCounter.objects.select_for_update().filter(pk=user_id)
+         .values_list('pk'))
+
+
+def follow_authors(user, author_ids):
+    """Подписывает на авторов; возвращает id новых подписок."""
+    author_ids = set(author_ids) - {user.pk}
+    with transaction.atomic():
+        _lock_user(user.pk)
+        existing = set(Follow.objects.filter(user=user,
+                                             author_id__in=author_ids)
+                       .values_list('author_id', flat=True))
+        added = set(User.objects.filter(pk__in=author_ids - existing)
+                    .values_list('pk', flat=True))
+        Follow.objects.bulk_create(
+            [Follow(user=user, author_id=author_id)
+             for author_id in sorted(added)],
+        )
+        follows_changed(user.pk, added=added)
+    return added
+
+
+def unfollow_authors(user, author_ids):
+    """Отписывает от авторов; возвращает id снятых подписок."""
+    with transaction.atomic():
+        _lock_user(user.pk)
+        with collect_changes(user.pk) as batch:
+            Follow.objects.filter(user=user,
+                                  author_id__in=set(author_ids)).delete()
+    return set(batch['removed'])
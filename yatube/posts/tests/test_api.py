@@ -0,0 +1,261 @@
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.changes import (INDEX_SCOPE, cache_timeout, high_water_mark,
+                           scope_version)
+from posts.following import following_ids
+from posts.graph import GRAPH_SCOPE, get_graph, graph
+from posts.models import (Follow, Group, Post, PostScore,
+                          RecommendationQueue)
+
+User = get_user_model()
+
+
+@override_settings(PAGINATOR_VALUE=3)
+class PostApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый пост {i}',
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_index_cursor_pagination(self):
+        response = self.guest_client.get(reverse('posts:api_index'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        data = response.json()
+        self.assertEqual(len(data['results']), 3)
+        self.assertIsNotNone(data['next'])
+
+        next_page = self.guest_client.get(data['next']).json()
+        self.assertEqual(len(next_page['results']), 2)
+        self.assertIsNone(next_page['next'])
+
+        ids = [item['id'] for item in data['results'] + next_page['results']]
+        expected = list(Post.objects.values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_fields_selection(self):
+        response = self.guest_client.get(
+            reverse('posts:api_index'), {'fields': 'id,author'})
+        item = response.json()['results'][0]
+        self.assertEqual(set(item), {'id', 'author'})
+        self.assertEqual(item['author'], self.user.username)
+
+    def test_unknown_field_and_bad_cursor(self):
+        response = self.guest_client.get(
+            reverse('posts:api_index'), {'fields': 'password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        response = self.guest_client.get(
+            reverse('posts:api_index'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_group_and_profile_scopes(self):
+        response = self.guest_client.get(
+            reverse('posts:api_group_list', kwargs={'slug': self.group.slug}),
+            {'fields': 'group'},
+        )
+        groups = {item['group'] for item in response.json()['results']}
+        self.assertEqual(groups, {self.group.slug})
+
+        response = self.guest_client.get(
+            reverse('posts:api_profile', kwargs={'username': 'auth'}))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_detail_etag(self):
+        url = reverse('posts:api_post_detail',
+                      kwargs={'post_id': self.posts[0].pk})
+        response = self.guest_client.get(url)
+        self.assertEqual(response.json()['text'], self.posts[0].text)
+        self.assertIn('ETag', response)
+
+        cached = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, HTTPStatus.NOT_MODIFIED)
+
+
+class NewSinceApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+        cls.group_post = Post.objects.create(
+            author=cls.author, text='В группе', group=cls.group)
+        cls.other_post = Post.objects.create(author=cls.other, text='Чужой')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_counts_per_feed(self):
+        cases = {
+            reverse('posts:api_index_new'): (self.guest_client, 2),
+            reverse('posts:api_group_new', kwargs={'slug': 'test-slug'}): (
+                self.guest_client, 1),
+            reverse('posts:api_profile_new',
+                    kwargs={'username': 'author'}): (self.guest_client, 1),
+            reverse('posts:api_follow_new'): (self.authorized_client, 1),
+        }
+        for url, (client, count) in cases.items():
+            with self.subTest(url=url):
+                response = client.get(url, {'since': self.old_post.pk})
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(response.json()['count'], count)
+
+    def test_since_time(self):
+        Post.objects.filter(pk=self.old_post.pk).update(
+            pub_date='2020-01-01T00:00:00Z')
+        response = self.guest_client.get(
+            reverse('posts:api_index_new'),
+            {'since_time': '2021-01-01T00:00:00'})
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_up_to_date_client_costs_no_queries(self):
+        url = reverse('posts:api_index_new')
+        self.guest_client.get(url, {'since': 0})
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                url, {'since': self.other_post.pk})
+        self.assertEqual(response.json(), {'count': 0, 'latest': None})
+
+    def test_new_post_invalidates_high_water_mark(self):
+        mark = high_water_mark(INDEX_SCOPE, Post.objects.all())
+        self.assertEqual(mark['pk'], self.other_post.pk)
+        post = Post.objects.create(author=self.other, text='Новый')
+        mark = high_water_mark(INDEX_SCOPE, Post.objects.all())
+        self.assertEqual(mark['pk'], post.pk)
+
+    def test_process_local_mark_expires(self):
+        # Пост сохранил другой воркер: в этом процессе версия не сменилась.
+        high_water_mark(INDEX_SCOPE, Post.objects.all())
+        Post.objects.bulk_create([Post(author=self.other, text='Новый')])
+        later = time.time() + settings.LOCAL_FEED_CACHE_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            mark = high_water_mark(INDEX_SCOPE, Post.objects.all())
+        self.assertEqual(mark['pk'], Post.objects.latest('pk').pk)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_cache_timeout(self):
+        self.assertEqual(cache_timeout(), settings.LOCAL_FEED_CACHE_TIMEOUT)
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': '/nonexistent'}}):
+            self.assertEqual(cache_timeout(), settings.FEED_CACHE_TIMEOUT)
+
+    def test_response_cached(self):
+        url = reverse('posts:api_index_new')
+        self.guest_client.get(url, {'since': self.old_post.pk})
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, {'since': self.old_post.pk})
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_bad_since(self):
+        url = reverse('posts:api_index_new')
+        for params in ({}, {'since': 'x'}, {'since_time': 'вчера'}):
+            with self.subTest(params=params):
+                response = self.guest_client.get(url, params)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.BAD_REQUEST)
+
+
+@override_settings(FOLLOW_GRAPH=True)
+class BulkFollowApiTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader')
+        self.authors = [User.objects.create_user(username=f'author{i}')
+                        for i in range(3)]
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='-')
+        for author in self.authors[1:]:
+            Post.objects.create(author=author, text='Пост', group=self.group)
+        Follow.objects.create(user=self.user, author=self.authors[0])
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('posts:api_follow_bulk')
+        graph.load(scope_version(GRAPH_SCOPE))
+
+    def test_follow_group_authors_in_one_batch(self):
+        # Граф и кеш подписок прогреты до массовой подписки.
+        graph_version = get_graph().version
+        self.assertEqual(len(following_ids(self.user.pk)), 1)
+        RecommendationQueue.objects.all().delete()
+        response = self.client.post(self.url, {
+            'author': [self.authors[0].username, 'missing', 'reader'],
+            'group': self.group.slug,
+        })
+        self.assertEqual(response.json(), {'action': 'follow', 'changed': 2})
+        self.assertEqual(Follow.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(following_ids(self.user.pk),
+                         {author.pk for author in self.authors})
+        current = get_graph()
+        self.assertEqual(current.version, graph_version + 1)
+        self.assertEqual(current.following_count(self.user.pk), 3)
+        self.assertTrue(RecommendationQueue.objects.filter(
+            user=self.user).exists())
+        # Массовая подписка поднимает посты авторов так же, как обычная.
+        self.assertEqual(PostScore.objects.count(), 2)
+
+    def test_unfollow(self):
+        response = self.client.post(self.url, {
+            'action': 'unfollow',
+            'author': [author.username for author in self.authors],
+        })
+        self.assertEqual(response.json(),
+                         {'action': 'unfollow', 'changed': 1})
+        self.assertFalse(Follow.objects.filter(user=self.user).exists())
+        self.assertEqual(following_ids(self.user.pk), frozenset())
+        self.assertEqual(get_graph().following_count(self.user.pk), 0)
+
+    @override_settings(BULK_FOLLOW_LIMIT=2)
+    def test_bad_requests(self):
+        cases = (
+            {'action': 'block', 'author': ['author1']},
+            {'author': ['author0', 'author1', 'author2']},
+            # Вместе с двумя авторами группы авторов уже три.
+            {'author': ['author0'], 'group': self.group.slug},
+            {'author': ['missing']},
+        )
+        for data in cases:
+            with self.subTest(data=data):
+                response = self.client.post(self.url, data)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.BAD_REQUEST)
+        self.assertEqual(
+            self.client.get(self.url).status_code,
+            HTTPStatus.METHOD_NOT_ALLOWED)
@@ -0,0 +1,95 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import F
+from django.test import Client, TestCase, override_settings
+
+from posts.management.commands.benchmark import (benchmark_urls,
+                                                 failed_statuses, summarize)
+from posts.models import Comment, Follow, Group, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_SITEMAP_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, SITEMAP_ROOT=TEMP_SITEMAP_ROOT)
+class BenchmarkCommandsTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_SITEMAP_ROOT, ignore_errors=True)
+
+    def test_generate_data(self):
+        call_command('generate_data', users=20, groups=3, posts=50,
+                     comments=40, follows=3, image_ratio=0.5,
+                     stdout=StringIO())
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 50)
+        self.assertEqual(Comment.objects.count(), 40)
+        self.assertFalse(Comment.objects.filter(path='').exists())
+        self.assertTrue(
+            Post.objects.filter(image__startswith='posts/').exists())
+        self.assertFalse(
+            Follow.objects.filter(user=F('author')).exists())
+
+    def test_generate_data_clamps_batch_size(self):
+        # SQLite не принимает вставку больше чем из 500 строк.
+        call_command('generate_data', users=10, groups=2, posts=600,
+                     comments=600, image_ratio=0, batch_size=1000,
+                     stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 600)
+        self.assertEqual(Comment.objects.count(), 600)
+
+    def test_benchmark_covers_every_url(self):
+        call_command('generate_data', users=5, groups=2, posts=10,
+                     comments=5, image_ratio=0, stdout=StringIO())
+        urls = benchmark_urls()
+        self.assertIn('main_page', urls)
+        self.assertIn('post_detail', urls)
+        self.assertIn('follow_index', urls)
+        self.assertNotIn('profile_follow', urls)
+        self.assertIn('?since=', urls['api_index_new'])
+
+    def test_benchmark_routes_answer_successfully(self):
+        call_command('generate_data', users=5, groups=2, posts=10,
+                     comments=5, image_ratio=0, stdout=StringIO())
+        client = Client()
+        client.force_login(User.objects.first())
+        for name, url in benchmark_urls().items():
+            with self.subTest(name=name):
+                response = client.get(url)
+                response.close()
+                self.assertLess(response.status_code, 400)
+        self.assertTrue(Comment.objects.filter(reply_count__gt=0).exists())
+
+    def test_summarize_percentiles(self):
+        samples = [(i / 1000, 2, 200) for i in range(1, 101)]
+        summary = summarize('/', samples, wall_time=2)
+        self.assertEqual(summary['rps'], 50)
+        self.assertEqual(summary['p50_ms'], 51)
+        self.assertEqual(summary['p99_ms'], 99)
+        self.assertEqual(summary['queries_per_request'], 2)
+        self.assertEqual(summary['statuses'], {'200': 100})
+
+    def test_failed_statuses(self):
+        samples = [(0.1, 1, 200), (0.1, 1, 302), (0.1, 1, 404),
+                   (0.1, 1, 404), (0.1, 1, 500)]
+        self.assertEqual(failed_statuses(samples), {'404': 2, '500': 1})
+
+    def test_export_posts(self):
+        call_command('generate_data', users=5, groups=2, posts=15,
+                     comments=0, image_ratio=0, stdout=StringIO())
+        out = StringIO()
+        call_command('export_posts', chunk_size=4, stdout=out,
+                     stderr=StringIO())
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 15)
+        self.assertEqual([row['id'] for row in rows],
+                         sorted(Post.objects.values_list('pk', flat=True)))
+        self.assertIn('author__username', rows[0])
@@ -0,0 +1,147 @@
+import re
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import COMMENT_MAX_DEPTH, Comment, Post
+
+User = get_user_model()
+COMMENT_ID = re.compile(r'id="comment-(\d+)"')
+
+
+class CommentThreadsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.other_post = Post.objects.create(author=cls.user, text='Другой')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def comment(self, parent=None, text='Комментарий'):
+        return Comment.objects.create(post=self.post, author=self.user,
+                                      parent=parent, text=text)
+
+    def reply_counts(self, *comments):
+        return [Comment.objects.get(pk=comment.pk).reply_count
+                for comment in comments]
+
+    def test_path_and_reply_counts(self):
+        root = self.comment()
+        child = self.comment(root)
+        grandchild = self.comment(child)
+        sibling = self.comment(root)
+        self.assertEqual(grandchild.depth, 2)
+        self.assertTrue(grandchild.path.startswith(child.path))
+        self.assertEqual(self.reply_counts(root, child, sibling), [3, 1, 0])
+        ordered = list(Comment.objects.order_by('path'))
+        self.assertEqual(ordered, [root, child, grandchild, sibling])
+
+    def test_delete_subtree_updates_ancestors(self):
+        root = self.comment()
+        child = self.comment(root)
+        self.comment(self.comment(child))
+        self.comment(root)
+        child.delete()
+        self.assertEqual(self.reply_counts(root), [1])
+
+    def test_cascade_delete_updates_ancestors_once(self):
+        root = self.comment()
+        other = User.objects.create_user(username='other')
+        for _ in range(3):
+            reply = Comment.objects.create(post=self.post, author=other,
+                                           text='Ответ', parent=root)
+            self.comment(reply)
+        self.comment(root)
+        with CaptureQueriesContext(connection) as context:
+            other.delete()
+        updates = [query for query in context.captured_queries
+                   if query['sql'].startswith('UPDATE "posts_comment"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.reply_counts(root), [1])
+
+    def test_failed_delete_does_not_leak_into_next(self):
+        root = self.comment()
+        failed = self.comment(root)
+        deleted = self.comment(root)
+        with self.assertRaises(DatabaseError):
+            with transaction.atomic(), mock.patch(
+                    'django.db.models.sql.DeleteQuery.delete_batch',
+                    side_effect=DatabaseError):
+                failed.delete()
+        deleted.delete()
+        self.assertEqual(self.reply_counts(root), [1])
+        Comment.objects.get(pk=failed.pk).delete()
+        self.assertEqual(self.reply_counts(root), [0])
+
+    def test_depth_is_limited(self):
+        parent = None
+        for _ in range(COMMENT_MAX_DEPTH + 2):
+            parent = self.comment(parent)
+        self.assertEqual(parent.depth, COMMENT_MAX_DEPTH)
+
+    @override_settings(COMMENT_THREAD_DEPTH=2, COMMENTS_PAGINATOR_VALUE=2)
+    def test_replies_slice(self):
+        root = self.comment()
+        child = self.comment(root)
+        grandchild = self.comment(child)
+        deep = self.comment(grandchild)
+        second = self.comment(root)
+        url = reverse('posts:comment_replies',
+                      kwargs={'post_id': self.post.pk, 'comment_id': root.pk})
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(url)
+        content = response.content.decode()
+        self.assertEqual(COMMENT_ID.findall(content),
+                         [str(child.pk), str(grandchild.pk)])
+        self.assertNotIn(str(deep.pk), COMMENT_ID.findall(content))
+        self.assertIn(reverse('posts:comment_replies', kwargs={
+            'post_id': self.post.pk, 'comment_id': grandchild.pk}), content)
+
+        next_url = re.search(r'href="([^"]+cursor=[^"]+)"', content)[1]
+        response = self.guest_client.get(next_url)
+        self.assertEqual(COMMENT_ID.findall(response.content.decode()),
+                         [str(second.pk)])
+
+    def test_replies_of_other_post(self):
+        root = self.comment()
+        response = self.guest_client.get(reverse(
+            'posts:comment_replies',
+            kwargs={'post_id': self.other_post.pk, 'comment_id': root.pk}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_only_roots_on_post_detail(self):
+        root = self.comment()
+        self.comment(root)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertEqual(list(response.context['comments']), [root])
+        self.assertContains(response, 'Показать ответы (1)')
+
+    def test_reply_via_form(self):
+        root = self.comment()
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Ответ', 'parent': root.pk})
+        reply = Comment.objects.get(text='Ответ')
+        self.assertEqual(reply.parent, root)
+        self.assertEqual(self.reply_counts(root), [1])
+
+    def test_reply_to_comment_of_other_post_rejected(self):
+        foreign = Comment.objects.create(post=self.other_post,
+                                         author=self.user, text='Чужой')
+        response = self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Ответ', 'parent': foreign.pk},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertFalse(Comment.objects.filter(text='Ответ').exists())
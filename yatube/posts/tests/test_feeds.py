@@ -0,0 +1,81 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostFeedsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Другое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_feeds_available(self):
+        urls = {
+            reverse('posts:index_rss'): 'application/rss+xml',
+            reverse('posts:index_atom'): 'application/atom+xml',
+            reverse('posts:group_rss', kwargs={'slug': self.group.slug}):
+            'application/rss+xml',
+            reverse('posts:group_atom', kwargs={'slug': self.group.slug}):
+            'application/atom+xml',
+            reverse('posts:profile_rss', kwargs={'username': 'auth'}):
+            'application/rss+xml',
+            reverse('posts:profile_atom', kwargs={'username': 'auth'}):
+            'application/atom+xml',
+        }
+        for url, content_type in urls.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertTrue(response['Content-Type'].startswith(
+                    content_type))
+                self.assertIn(self.post.text, response.content.decode())
+
+    def test_unknown_group_feed_404(self):
+        response = self.guest_client.get(
+            reverse('posts:group_rss', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_conditional_get_and_invalidation(self):
+        url = reverse('posts:group_rss', kwargs={'slug': self.group.slug})
+        response = self.guest_client.get(url)
+        etag = response['ETag']
+
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+        Post.objects.create(author=self.user, text='Новый пост',
+                            group=self.other_group)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+        self.post.group = self.other_group
+        self.post.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotIn(self.post.text, response.content.decode())
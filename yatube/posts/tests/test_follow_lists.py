@@ -0,0 +1,121 @@
+import re
+from importlib import import_module
+from http import HTTPStatus
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.counters import follow_counts, rebuild
+from posts.models import Follow, FollowCounter
+from posts.subscriptions import follow_authors, unfollow_authors
+
+User = get_user_model()
+USER_ID = re.compile(r'id="user-(\d+)"')
+
+
+def user_ids(content):
+    return [int(pk) for pk in USER_ID.findall(content.decode())]
+
+
+@override_settings(FOLLOW_PAGINATOR_VALUE=2)
+class FollowListsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [User.objects.create_user(username=f'reader{i}')
+                       for i in range(5)]
+        for reader in cls.readers:
+            Follow.objects.create(user=reader, author=cls.author)
+        Follow.objects.create(user=cls.author, author=cls.readers[0])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_followers_newest_first_with_counts(self):
+        response = self.client.get(
+            reverse('posts:followers', args=[self.author.username]))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(user_ids(response.content),
+                         [self.readers[4].pk, self.readers[3].pk])
+        self.assertEqual(response.context['followers_count'], 5)
+        self.assertEqual(response.context['following_count'], 1)
+        self.assertIsNotNone(response.context['next_page'])
+
+    def test_fragments_walk_whole_list(self):
+        url = reverse('posts:followers', args=[self.author.username])
+        response = self.client.get(url)
+        seen = user_ids(response.content)
+        url = response.context['next_fragment']
+        while url:
+            response = self.client.get(url)
+            self.assertTemplateUsed(response, 'posts/includes/user_list.html')
+            seen += user_ids(response.content)
+            url = response.get('X-Next-Page')
+        self.assertEqual(seen,
+                         [reader.pk for reader in reversed(self.readers)])
+
+    def test_following_list(self):
+        response = self.client.get(
+            reverse('posts:following', args=[self.author.username]))
+        self.assertEqual(user_ids(response.content), [self.readers[0].pk])
+        self.assertIsNone(response.context['next_page'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            reverse('posts:followers', args=[self.author.username]),
+            {'cursor': 'broken'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+
+class FollowCountersTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.readers = [User.objects.create_user(username=f'reader{i}')
+                        for i in range(3)]
+
+    def test_counts_follow_signals_and_cascade(self):
+        for reader in self.readers:
+            Follow.objects.create(user=reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.readers[0])
+        self.assertEqual(follow_counts(self.author.pk), (3, 1))
+        self.assertEqual(follow_counts(self.readers[0].pk), (1, 1))
+        Follow.objects.filter(user=self.readers[1]).delete()
+        self.readers[0].delete()
+        self.assertEqual(follow_counts(self.author.pk), (1, 0))
+
+    def test_bulk_follow_and_unfollow(self):
+        author_ids = [reader.pk for reader in self.readers]
+        follow_authors(self.author, author_ids)
+        self.assertEqual(follow_counts(self.author.pk), (0, 3))
+        self.assertEqual(follow_counts(self.readers[2].pk), (1, 0))
+        unfollow_authors(self.author, author_ids[:2])
+        self.assertEqual(follow_counts(self.author.pk), (0, 1))
+        self.assertEqual(follow_counts(self.readers[0].pk), (0, 0))
+
+    def test_rebuild_matches_signals(self):
+        for reader in self.readers:
+            Follow.objects.create(user=reader, author=self.author)
+        counts = follow_counts(self.author.pk)
+        rebuild()
+        self.assertEqual(follow_counts(self.author.pk), counts)
+
+    def test_rebuild_and_migration_fill_many_counters(self):
+        # SQLite вставляет пакетами не больше 500 строк.
+        User.objects.bulk_create(User(username=f'many{i}')
+                                 for i in range(600))
+        users = User.objects.filter(username__startswith='many')
+        Follow.objects.bulk_create(Follow(user=user, author=self.author)
+                                   for user in users)
+        rebuild()
+        self.assertEqual(FollowCounter.objects.count(), 601)
+        self.assertEqual(follow_counts(self.author.pk), (600, 0))
+        FollowCounter.objects.all().delete()
+        migration = import_module('posts.migrations.0019_follow_counters')
+        migration.fill_counters(apps, None)
+        self.assertEqual(FollowCounter.objects.count(), 601)
+        self.assertEqual(follow_counts(self.author.pk), (600, 0))
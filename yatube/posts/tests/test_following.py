@@ -0,0 +1,89 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts.following import FollowState, following_ids
+from posts.models import Follow
+
+User = get_user_model()
+
+
+class FollowStateTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.authors = [User.objects.create_user(username=f'author{i}')
+                       for i in range(5)]
+        Follow.objects.create(user=cls.user, author=cls.authors[0])
+        Follow.objects.create(user=cls.user, author=cls.authors[1])
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_one_query_for_all_authors(self):
+        template = Template(
+            '{% for author in authors %}'
+            '{% if author in follow_state %}{{ author.username }} '
+            '{% endif %}{% endfor %}')
+        with self.assertNumQueries(1):
+            content = template.render(Context({
+                'authors': self.authors,
+                'follow_state': FollowState(self.user),
+            }))
+        self.assertEqual(content.split(), ['author0', 'author1'])
+        with self.assertNumQueries(0):
+            self.assertIn(self.authors[0], FollowState(self.user))
+
+    def test_anonymous_user(self):
+        with self.assertNumQueries(0):
+            self.assertNotIn(self.authors[0], FollowState(AnonymousUser()))
+
+    def test_follow_lists_mark_followed_users(self):
+        Follow.objects.create(user=self.authors[2], author=self.authors[0])
+        Follow.objects.create(user=self.authors[2], author=self.authors[3])
+        url = reverse('posts:following',
+                      kwargs={'username': self.authors[2].username})
+        for params in ({}, {'fragment': 1}):
+            with self.subTest(params=params):
+                content = self.authorized_client.get(
+                    url, params).content.decode()
+                marked = [
+                    int(pk) for pk, item in re.findall(
+                        r'id="user-(\d+)">(.*?)</li>', content, re.S)
+                    if 'вы подписаны' in item
+                ]
+                self.assertEqual(marked, [self.authors[0].pk])
+
+    def test_profile_uses_follow_state(self):
+        response = self.authorized_client.get(reverse(
+            'posts:profile', kwargs={'username': self.authors[0].username}))
+        self.assertTrue(response.context['following'])
+
+
+# Кеш сбрасывается в on_commit, который TestCase не выполняет.
+class FollowCacheInvalidationTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader')
+        self.author = User.objects.create_user(username='author')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_follow_and_unfollow_invalidate_cache(self):
+        following_ids(self.user.pk)
+        self.authorized_client.get(reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.author.username}))
+        self.assertIn(self.author.pk, following_ids(self.user.pk))
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.author.username}))
+        self.assertNotIn(self.author.pk, following_ids(self.user.pk))
@@ -121,6 +121,43 @@ class PostCreateFormTests(TestCase):
         )
         self.assertNotEqual(Comment.objects.count(), comments_count + 1)
 
+    def test_ajax_comment_returns_fragment(self):
+        response = self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Коммент без перезагрузки'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertTemplateUsed(response, 'includes/comment.html')
+        self.assertNotContains(response, '<html', status_code=201)
+        self.assertContains(response, 'Коммент без перезагрузки',
+                            status_code=201)
+        self.assertTrue(self.post.comments.filter(
+            text='Коммент без перезагрузки').exists())
+
+    def test_ajax_comment_json(self):
+        response = self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Коммент в JSON'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        data = response.json()
+        self.assertEqual(data['text'], 'Коммент в JSON')
+        self.assertEqual(data['author'], self.user.username)
+
+    def test_ajax_comment_errors(self):
+        comments_count = Comment.objects.count()
+        response = self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': ''},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('text', response.json()['errors'])
+        self.assertEqual(Comment.objects.count(), comments_count)
+
     def test_create_group_post_form(self):
         posts_count = Post.objects.count()
         small_gif = (
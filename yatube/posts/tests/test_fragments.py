@@ -0,0 +1,119 @@
+import re
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+POST_LINK = re.compile(r'/posts/(\d+)/')
+COMMENT_ID = re.compile(r'id="comment-(\d+)"')
+
+
+def post_ids(content):
+    return [int(pk) for pk in POST_LINK.findall(content.decode())]
+
+
+@override_settings(PAGINATOR_VALUE=3)
+class FeedFragmentsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for i in range(8):
+            Post.objects.create(author=cls.author, text=f'Пост {i}',
+                                group=cls.group if i % 2 else None)
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def scroll(self, url, queryset):
+        response = self.client.get(url)
+        ids = [post.pk for post in response.context['page_obj']]
+        next_url = response.context['next_fragment']
+        while next_url:
+            response = self.client.get(next_url)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertNotIn(b'<html', response.content)
+            ids += post_ids(response.content)
+            next_url = response.get('X-Next-Page')
+        self.assertEqual(
+            ids, list(queryset.order_by('-pub_date', '-pk')
+                      .values_list('pk', flat=True)))
+
+    def test_scroll_through_feeds(self):
+        feeds = {
+            reverse('posts:main_page'): Post.objects.all(),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}):
+                self.group.posts.all(),
+            reverse('posts:profile', kwargs={'username': 'author'}):
+                self.author.posts.all(),
+            reverse('posts:follow_index'): Post.objects.filter(
+                author__following__user=self.user),
+        }
+        for url, queryset in feeds.items():
+            with self.subTest(url=url):
+                self.scroll(url, queryset)
+
+    def test_last_page_has_no_next_fragment(self):
+        response = self.client.get(reverse('posts:main_page'), {'page': 3})
+        self.assertIsNone(response.context['next_fragment'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('posts:main_page'),
+                                   {'fragment': 1, 'cursor': 'bad'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+
+@override_settings(COMMENTS_PAGINATOR_VALUE=3)
+class CommentsPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.comments = [
+            Comment.objects.create(post=cls.post, author=cls.user,
+                                   text=f'Комментарий {i}')
+            for i in range(7)
+        ]
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_load_all_comments(self):
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        ids = [comment.pk for comment in response.context['comments']]
+        self.assertEqual(len(ids), 3)
+        next_url = response.context['next_comments']
+        while next_url:
+            with self.assertNumQueries(2):
+                response = self.guest_client.get(next_url)
+            ids += [int(pk) for pk in
+                    COMMENT_ID.findall(response.content.decode())]
+            next_url = response.get('X-Next-Page')
+        self.assertEqual(ids, [comment.pk for comment in self.comments])
+
+    def test_comments_of_missing_post(self):
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_invalid_comments_cursor(self):
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            {'cursor': 'bad'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
@@ -0,0 +1,138 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.changes import scope_version
+from posts.checks import follow_graph_cache
+from posts.graph import (GRAPH_SCOPE, LOG_KEY, FollowGraph, get_graph,
+                         graph)
+from posts.models import Follow
+
+User = get_user_model()
+
+
+class FollowGraphTest(TestCase):
+    def setUp(self):
+        self.graph = FollowGraph()
+        edges = [(1, 2), (1, 3), (2, 1), (3, 1), (4, 1), (2, 3), (1, 4)]
+        for user_id, author_id in edges:
+            self.graph.add(user_id, author_id)
+
+    def test_counts_and_membership(self):
+        self.assertEqual(self.graph.following_count(1), 3)
+        self.assertEqual(self.graph.followers_count(1), 3)
+        self.assertEqual(self.graph.followers_count(5), 0)
+        self.assertTrue(self.graph.is_following(2, 3))
+        self.assertFalse(self.graph.is_following(3, 2))
+
+    def test_mutual_and_followed_by_following(self):
+        self.assertEqual(self.graph.mutual(1), [2, 3, 4])
+        # Пользователь 1 читает 2, 3 и 4; из них автора 3 читает только 2.
+        self.assertEqual(self.graph.followed_by_following(1, 3), [2])
+
+    def test_remove_and_duplicates(self):
+        self.graph.add(1, 2)
+        self.assertEqual(self.graph.following_count(1), 3)
+        self.graph.remove(1, 2)
+        self.graph.remove(1, 5)
+        self.assertEqual(list(self.graph.following[1]), [3, 4])
+        self.assertEqual(self.graph.mutual(1), [3, 4])
+
+
+@override_settings(FOLLOW_GRAPH=True)
+class GraphSyncTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(username=f'user{i}')
+                      for i in range(3)]
+        Follow.objects.create(user=self.users[0], author=self.users[1])
+        graph.load(scope_version(GRAPH_SCOPE))
+
+    def test_updated_on_commit(self):
+        loaded_version = graph.version
+        Follow.objects.create(user=self.users[2], author=self.users[1])
+        Follow.objects.filter(user=self.users[0]).delete()
+        current = get_graph()
+        self.assertEqual(current.version, loaded_version + 2)
+        self.assertEqual(list(current.followers[self.users[1].pk]),
+                         [self.users[2].pk])
+
+    def test_other_process_catches_up_from_log(self):
+        other = FollowGraph()
+        other.load(scope_version(GRAPH_SCOPE))
+        Follow.objects.create(user=self.users[2], author=self.users[1])
+        with self.assertNumQueries(0):
+            self.assertTrue(other.catch_up(scope_version(GRAPH_SCOPE)))
+        self.assertEqual(other.followers_count(self.users[1].pk), 2)
+
+    def test_missing_log_entry_needs_reload(self):
+        other = FollowGraph()
+        other.load(scope_version(GRAPH_SCOPE))
+        Follow.objects.create(user=self.users[2], author=self.users[1])
+        cache.delete(LOG_KEY.format(scope_version(GRAPH_SCOPE)))
+        with mock.patch('posts.graph.LOG_GRACE', 0):
+            self.assertFalse(other.catch_up(scope_version(GRAPH_SCOPE)))
+
+    def test_not_loaded_graph_is_not_used(self):
+        graph.version = None
+        with mock.patch.object(graph, 'load_in_background') as load:
+            self.assertIsNone(get_graph())
+        load.assert_called_once_with()
+
+    def test_check_requires_shared_cache(self):
+        errors = follow_graph_cache(None)
+        self.assertEqual([error.id for error in errors], ['posts.E001'])
+
+
+class ProfileGraphTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.viewer = User.objects.create_user(username='viewer')
+        cls.friend = User.objects.create_user(username='friend')
+        cls.other_friend = User.objects.create_user(username='other')
+        cls.author = User.objects.create_user(username='author')
+        for user, author in ((cls.viewer, cls.friend),
+                             (cls.viewer, cls.other_friend),
+                             (cls.friend, cls.author),
+                             (cls.other_friend, cls.author),
+                             (cls.author, cls.viewer)):
+            Follow.objects.create(user=user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.viewer)
+
+    def get_profile(self):
+        return self.client.get(
+            reverse('posts:profile', kwargs={'username': 'author'}))
+
+    @override_settings(FOLLOWED_BY_PREVIEW=1)
+    def test_profile_context(self):
+        response = self.get_profile()
+        context = response.context
+        self.assertEqual(context['followers_count'], 2)
+        self.assertEqual(context['following_count'], 1)
+        self.assertTrue(context['follows_you'])
+        self.assertEqual(list(context['followed_by']), [self.friend])
+        self.assertEqual(context['followed_by_more'], 1)
+        self.assertContains(response, 'Подписан на вас')
+        self.assertContains(response, 'и ещё 1')
+
+    @override_settings(FOLLOW_GRAPH=True)
+    def test_graph_gives_same_context(self):
+        names = ('followers_count', 'following_count', 'follows_you',
+                 'followed_by_more')
+        expected = {name: self.get_profile().context[name]
+                    for name in names}
+        graph.load(scope_version(GRAPH_SCOPE))
+        self.addCleanup(graph.load)
+        context = self.get_profile().context
+        self.assertEqual({name: context[name] for name in names}, expected)
+        self.assertEqual(list(context['followed_by']),
+                         [self.friend, self.other_friend])
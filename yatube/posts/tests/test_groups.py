@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class GroupDirectoryTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.first = Group.objects.create(
+            title='Первая', slug='first', description='-')
+        cls.second = Group.objects.create(
+            title='Вторая', slug='second', description='-')
+        Post.objects.create(author=cls.author, text='Старый',
+                            group=cls.first)
+        cls.latest = Post.objects.create(author=cls.author, text='Новый',
+                                         group=cls.first)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.url = reverse('posts:groups')
+
+    def directory(self):
+        response = self.client.get(self.url)
+        return {group['slug']: group for group in response.context['groups']}
+
+    def test_counts_and_latest_post(self):
+        groups = self.directory()
+        self.assertEqual(list(groups), ['second', 'first'])
+        self.assertEqual(groups['first']['posts_count'], 2)
+        self.assertEqual(groups['first']['latest_id'], self.latest.pk)
+        self.assertEqual(groups['second']['posts_count'], 0)
+        self.assertIsNone(groups['second']['latest_id'])
+
+    def test_cached_between_changes(self):
+        self.directory()
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_invalidated_on_post_changes(self):
+        self.directory()
+        post = Post.objects.create(author=self.author, text='Ещё',
+                                   group=self.second)
+        self.assertEqual(self.directory()['second']['latest_id'], post.pk)
+        # Перенос в другую группу.
+        post.group = self.first
+        post.save()
+        groups = self.directory()
+        self.assertEqual(groups['first']['posts_count'], 3)
+        self.assertEqual(groups['second']['posts_count'], 0)
+        post.delete()
+        self.assertEqual(self.directory()['first']['latest_id'],
+                         self.latest.pk)
+
+    def test_invalidated_on_group_changes(self):
+        self.directory()
+        Group.objects.create(title='Третья', slug='third', description='-')
+        self.assertIn('third', self.directory())
+        Group.objects.get(slug='second').delete()
+        self.assertNotIn('second', self.directory())
@@ -0,0 +1,93 @@
+import json
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+def events(response):
+    content = b''.join(response.streaming_content).decode()
+    result = []
+    for block in content.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines()
+                      if not line.startswith(':'))
+        if 'data' in fields:
+            result.append((fields['id'], json.loads(fields['data'])))
+    return result
+
+
+# Один шаг цикла: поток сразу завершается после первой проверки.
+@override_settings(LIVE_MAX_DURATION=0, LIVE_POLL_INTERVAL=0)
+class LivePostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+        cls.group_post = Post.objects.create(
+            author=cls.author, text='В группе', group=cls.group)
+        cls.other_post = Post.objects.create(author=cls.other, text='Чужой')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_new_posts_counted_per_feed(self):
+        since = self.old_post.pk
+        cases = {
+            reverse('posts:live_index'): (self.guest_client, 2,
+                                          self.other_post.pk),
+            reverse('posts:live_group', kwargs={'slug': self.group.slug}): (
+                self.guest_client, 1, self.group_post.pk),
+            reverse('posts:live_follow'): (self.authorized_client, 1,
+                                           self.group_post.pk),
+        }
+        for url, (client, count, latest) in cases.items():
+            with self.subTest(url=url):
+                response = client.get(url, {'since': since})
+                self.assertEqual(response['Content-Type'],
+                                 'text/event-stream')
+                self.assertEqual(events(response), [
+                    (str(since), {'count': count, 'latest': latest}),
+                ])
+
+    def test_last_event_id_used_on_reconnect(self):
+        response = self.guest_client.get(
+            reverse('posts:live_index'),
+            HTTP_LAST_EVENT_ID=str(self.group_post.pk))
+        self.assertEqual(events(response)[0][1]['count'], 1)
+
+    def test_no_events_without_new_posts(self):
+        response = self.guest_client.get(reverse('posts:live_index'))
+        self.assertEqual(events(response), [])
+
+    @override_settings(LIVE_KEEPALIVE=0)
+    def test_keepalive(self):
+        response = self.guest_client.get(reverse('posts:live_index'))
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn(': keepalive', content)
+
+    def test_invalid_since(self):
+        response = self.guest_client.get(reverse('posts:live_index'),
+                                         {'since': 'abc'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_follow_stream_requires_login(self):
+        response = self.guest_client.get(reverse('posts:live_follow'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
@@ -0,0 +1,192 @@
+"""Бюджет SQL-запросов для адресов сайта.
+
+GET: все именованные адреса приложений posts, about, users и /metrics;
+админка и неименованные адреса не проверяются. POST: создание и правка
+поста, комментарий и массовая подписка (POST_CASES).
+
+Каждый адрес открывается на маленьком наборе данных и на наборе, где
+страница заполнена целиком, а у каждого поста и комментария свой автор.
+Число запросов не должно расти вместе с размером страницы и не должно
+превышать значения из query_budget.json.
+
+Обновить бюджет после осознанного изменения:
+    UPDATE_QUERY_BUDGET=1 python manage.py test posts.tests.test_query_budget
+Сохранить отчёт с числом и временем запросов:
+    QUERY_BUDGET_REPORT=report.json python manage.py test ...
+"""
+import json
+import os
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from about import urls as about_urls
+from core.db.queries import count_queries
+from posts import trending
+from posts import urls as posts_urls
+from users import urls as users_urls
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BUDGET_PATH = os.path.join(os.path.dirname(__file__), 'query_budget.json')
+# Адреса posts в бюджете без пространства имён, остальные — с ним.
+URL_MODULES = (posts_urls, about_urls, users_urls)
+
+
+# Журнал медленных запросов сам пишет в базу и исказил бы замер.
+@override_settings(SLOW_QUERY_THRESHOLD_MS=None)
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create_user(username='viewer')
+        cls.author = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Тестовый пост', group=cls.group)
+        Follow.objects.create(user=cls.viewer, author=cls.author)
+        # Общий знакомый: без него профиль не запрашивает, кого из ваших
+        # подписок читает автор, и бюджет профиля занижен.
+        friend = User.objects.create_user(username='friend')
+        Follow.objects.create(user=cls.viewer, author=friend)
+        Follow.objects.create(user=friend, author=cls.author)
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.viewer, text='Комментарий')
+        Comment.objects.create(post=cls.post, author=cls.author,
+                               parent=cls.comment, text='Ответ')
+        # Оценка уже есть, и просмотр только обновляет её на обоих наборах.
+        trending.record('view', cls.post.pk, cls.group.pk)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.viewer)
+        # Просмотры копятся в кеше, как с общим кешем в бою.
+        patcher = mock.patch('posts.trending.is_process_local',
+                             return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fill_page(self):
+        for i in range(settings.PAGINATOR_VALUE):
+            author = User.objects.create_user(username=f'author{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='-')
+            Post.objects.create(author=author, text=f'Пост {i}', group=group)
+            Post.objects.create(author=author, text=f'Пост {i}',
+                                group=self.group)
+            Post.objects.create(author=self.author, text=f'Пост {i}',
+                                group=self.group)
+            Follow.objects.create(user=self.viewer, author=author)
+            Follow.objects.create(user=author, author=self.author)
+            Comment.objects.create(post=self.post, author=author,
+                                   text=f'Комментарий {i}')
+            Comment.objects.create(post=self.post, author=author,
+                                   parent=self.comment, text=f'Ответ {i}')
+
+    def url_kwargs(self):
+        return {
+            'post_id': self.post.pk,
+            'comment_id': self.comment.pk,
+            'slug': self.group.slug,
+            'username': self.author.username,
+            'filename': 'posts-0.xml',
+            'uidb64': 'MQ',
+            'token': 'set-password',
+        }
+
+    def post_cases(self):
+        """POST-запросы: имя адреса -> (пользователь, данные формы)."""
+        return {
+            'post_create': (self.viewer,
+                            {'text': 'Новый пост', 'group': self.group.pk}),
+            'post_edit': (self.author, {'text': 'Исправленный пост'}),
+            'add_comment': (self.viewer, {'text': 'Новый комментарий'}),
+            # Авторов группы больше на большом наборе данных.
+            'api_follow_bulk': (self.viewer, {'group': self.group.slug}),
+        }
+
+    def requests(self):
+        kwargs = self.url_kwargs()
+        for module in URL_MODULES:
+            for pattern in module.urlpatterns:
+                if not pattern.name:
+                    continue
+                url = reverse(
+                    f'{module.app_name}:{pattern.name}',
+                    kwargs={name: kwargs[name]
+                            for name in pattern.pattern.converters},
+                )
+                name = (pattern.name if module is posts_urls
+                        else f'{module.app_name}:{pattern.name}')
+                yield name, self.viewer, 'get', url, None
+        yield 'metrics', self.viewer, 'get', reverse('metrics'), None
+        patterns = {pattern.name: pattern
+                    for pattern in posts_urls.urlpatterns}
+        for name, (user, data) in self.post_cases().items():
+            url = reverse(
+                f'posts:{name}',
+                kwargs={key: kwargs[key]
+                        for key in patterns[name].pattern.converters},
+            )
+            yield f'POST {name}', user, 'post', url, data
+
+    def measure(self):
+        results = {}
+        for name, user, method, url, data in self.requests():
+            cache.clear()
+            # Заново и после users:logout, выходящего из аккаунта.
+            self.client.force_login(user)
+            # Откат после каждого адреса: подписки и комментарии,
+            # созданные одним адресом, не влияют на замер другого.
+            with transaction.atomic():
+                with count_queries() as counter:
+                    getattr(self.client, method)(url, data).close()
+                transaction.set_rollback(True)
+            results[name] = {
+                'queries': counter.count,
+                'sql_ms': round(counter.duration * 1000, 3),
+            }
+        return results
+
+    def test_query_budget(self):
+        small = self.measure()
+        self.fill_page()
+        large = self.measure()
+
+        report_path = os.getenv('QUERY_BUDGET_REPORT')
+        if report_path:
+            with open(report_path, 'w') as report:
+                json.dump({'small': small, 'large': large}, report,
+                          indent=2)
+        if os.getenv('UPDATE_QUERY_BUDGET'):
+            budget = {name: result['queries']
+                      for name, result in large.items()}
+            with open(BUDGET_PATH, 'w') as budget_file:
+                json.dump(budget, budget_file, indent=2, sort_keys=True)
+                budget_file.write('\n')
+
+        with open(BUDGET_PATH) as budget_file:
+            budget = json.load(budget_file)
+        for name, result in large.items():
+            with self.subTest(url=name):
+                self.assertEqual(
+                    result['queries'], small[name]['queries'],
+                    f'{name}: число запросов растёт с размером страницы '
+                    f'({small[name]["queries"]} -> {result["queries"]})',
+                )
+                self.assertIn(name, budget,
+                              f'{name}: добавьте адрес в query_budget.json')
+                self.assertLessEqual(
+                    result['queries'], budget[name],
+                    f'{name}: {result["queries"]} запросов '
+                    f'({result["sql_ms"]} мс SQL) при бюджете {budget[name]}',
+                )
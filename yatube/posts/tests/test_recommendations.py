@@ -0,0 +1,122 @@
+from collections import defaultdict
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Follow, Recommendation, RecommendationQueue
+from posts.recommendations import (Neighbourhood, latest_follows, refresh,
+                                   refresh_queued, score_candidates)
+
+User = get_user_model()
+
+
+class ScoreCandidatesTest(TestCase):
+    def area(self, edges):
+        following = defaultdict(set)
+        followers = defaultdict(list)
+        for user_id, author_id in edges:
+            following[user_id].add(author_id)
+            followers[author_id].append(user_id)
+        sampled = {user_id: sorted(authors)
+                   for user_id, authors in following.items()}
+        counts = {author_id: len(users)
+                  for author_id, users in followers.items()}
+        return Neighbourhood(following, sampled, followers, counts)
+
+    def test_friends_of_friends_ranked_first(self):
+        # 1 читает 2 и 3; оба читают 4, только 3 читает 5.
+        area = self.area([(1, 2), (1, 3), (2, 4), (3, 4), (3, 5), (3, 1)])
+        scores = score_candidates(area, 1, {}, {})
+        self.assertEqual([author for author, _ in scores], [4, 5])
+
+    def test_group_overlap_adds_candidates(self):
+        area = self.area([(1, 2)])
+        scores = score_candidates(area, 1, {2: {10}}, {10: {2, 6}})
+        self.assertEqual([author for author, _ in scores], [6])
+
+
+class LatestFollowsTest(TestCase):
+    def test_only_latest_follows_are_read(self):
+        author = User.objects.create_user(username='author')
+        readers = [User.objects.create_user(username=f'reader{i}')
+                   for i in range(5)]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=author)
+        with self.assertNumQueries(1):
+            latest = latest_follows('author_id', 'user_id', [author.pk], 2)
+        self.assertEqual(latest, {author.pk: [readers[3].pk,
+                                              readers[4].pk]})
+
+    @mock.patch('posts.recommendations.MAX_REFRESHED_FOLLOWERS', 1)
+    def test_refresh_is_capped_by_followers(self):
+        author = User.objects.create_user(username='author')
+        readers = [User.objects.create_user(username=f'reader{i}')
+                   for i in range(3)]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=author)
+        RecommendationQueue.objects.all().delete()
+        RecommendationQueue.objects.create(user=author)
+        # Сам автор и последний из его подписчиков.
+        self.assertEqual(refresh_queued(), 2)
+
+
+class RefreshTest(TestCase):
+    def test_refresh_writes_many_rows(self):
+        # Больше 500 строк: SQLite вставляет пакетами не больше 500.
+        hub = User.objects.create_user(username='hub')
+        User.objects.bulk_create(
+            [User(username=f'author{i}') for i in range(10)]
+            + [User(username=f'reader{i}') for i in range(60)])
+        authors = User.objects.filter(username__startswith='author')
+        readers = User.objects.filter(username__startswith='reader')
+        Follow.objects.bulk_create(
+            [Follow(user=hub, author=author) for author in authors]
+            + [Follow(user=reader, author=hub) for reader in readers])
+        refresh(list(readers.values_list('pk', flat=True)))
+        self.assertEqual(Recommendation.objects.count(), 600)
+
+
+class RecommendationsBatchTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader, self.friend, self.author = [
+            User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'author')
+        ]
+        Follow.objects.create(user=self.friend, author=self.author)
+
+    def test_follow_queues_and_command_refreshes(self):
+        RecommendationQueue.objects.all().delete()
+        Follow.objects.create(user=self.reader, author=self.friend)
+        self.assertTrue(RecommendationQueue.objects.filter(
+            user=self.reader).exists())
+        out = StringIO()
+        call_command('recommend_follows', stdout=out)
+        self.assertIn('пересчитано', out.getvalue())
+        self.assertFalse(RecommendationQueue.objects.exists())
+        self.assertEqual(
+            list(Recommendation.objects.filter(user=self.reader)
+                 .values_list('author_id', flat=True)),
+            [self.author.pk],
+        )
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['recommendations'], [self.author])
+        Follow.objects.create(user=self.reader, author=self.author)
+        # Подписка сразу скрывает автора, не дожидаясь пересчёта.
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['recommendations'], [])
+
+    def test_deleted_user_is_not_queued(self):
+        user = User.objects.create_user(username='gone')
+        user_id = user.pk
+        Follow.objects.create(user=user, author=self.author)
+        user.delete()
+        self.assertFalse(RecommendationQueue.objects.filter(
+            user_id=user_id).exists())
@@ -0,0 +1,93 @@
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+from posts.sitemaps import build_sitemaps
+
+User = get_user_model()
+
+TEMP_SITEMAP_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(SITEMAP_ROOT=TEMP_SITEMAP_ROOT, SITEMAP_CHUNK_SIZE=2)
+class SitemapTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {i}')
+            for i in range(5)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_SITEMAP_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.guest_client = Client()
+        build_sitemaps(force=True)
+
+    def test_sitemap_index_served(self):
+        response = self.guest_client.get(reverse('posts:sitemap'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('posts-', content)
+        self.assertIn('groups-', content)
+
+    def test_chunk_contains_post_urls(self):
+        post = self.posts[0]
+        chunk = post.pk // settings.SITEMAP_CHUNK_SIZE
+        response = self.guest_client.get(reverse(
+            'posts:sitemap_section', kwargs={'filename': f'posts-{chunk}.xml'}
+        ))
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+            content,
+        )
+
+    def test_only_changed_chunks_rewritten(self):
+        self.assertEqual(build_sitemaps(), [])
+
+        post = self.posts[-1]
+        chunk = post.pk // settings.SITEMAP_CHUNK_SIZE
+        post.delete()
+        written = build_sitemaps()
+        self.assertIn(f'posts-{chunk}.xml', written)
+        self.assertNotIn('groups-0.xml', written)
+        self.assertEqual(
+            [name for name in written if name.startswith('posts-')],
+            [f'posts-{chunk}.xml'],
+        )
+
+    def test_renamed_location_rewrites_chunk(self):
+        chunk = self.group.pk // settings.SITEMAP_CHUNK_SIZE
+        Group.objects.filter(pk=self.group.pk).update(slug='renamed')
+        self.assertEqual(build_sitemaps()[:1], [f'groups-{chunk}.xml'])
+        response = self.guest_client.get(reverse(
+            'posts:sitemap_section',
+            kwargs={'filename': f'groups-{chunk}.xml'}))
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('/group/renamed/', content)
+        self.assertNotIn('/group/test-slug/', content)
+
+    def test_only_sitemap_files_served(self):
+        for filename in ('manifest.json', 'sitemap.xml.tmp', 'posts-x.xml',
+                         'posts-999.xml'):
+            with self.subTest(filename=filename):
+                response = self.guest_client.get(reverse(
+                    'posts:sitemap_section', kwargs={'filename': filename}))
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
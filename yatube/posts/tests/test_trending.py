@@ -0,0 +1,129 @@
+import math
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, GroupScore, Post, PostScore
+from posts.trending import flush_views, log_weight, logaddexp
+
+User = get_user_model()
+
+# Файловый кеш общий для процессов, как memcached или redis в бою.
+TEMP_CACHE_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SHARED_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': TEMP_CACHE_ROOT,
+}}
+
+
+class ScoreMathTest(TestCase):
+    def test_logaddexp(self):
+        self.assertAlmostEqual(logaddexp(math.log(2), math.log(3)),
+                               math.log(5))
+        # Большие значения не переполняют float.
+        self.assertAlmostEqual(logaddexp(1000.0, 1000.0),
+                               1000 + math.log(2))
+
+    def test_old_events_decay(self):
+        now = timezone.now()
+        old = now - timedelta(seconds=3 * settings.TRENDING_HALF_LIFE)
+        # Комментарий весит 5, но через три полураспада меньше 1.
+        self.assertLess(log_weight('comment', old), log_weight('view', now))
+        self.assertGreater(log_weight('comment', now),
+                           log_weight('view', now))
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class TrendingTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_CACHE_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.viewed = Post.objects.create(author=cls.author, text='Смотрят')
+        cls.discussed = Post.objects.create(
+            author=cls.author, text='Обсуждают', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_events_update_scores(self):
+        url = reverse('posts:post_detail', args=[self.viewed.pk])
+        self.client.get(url)
+        # Просмотр ждёт в кеше, пока его не перенесёт команда.
+        self.assertFalse(PostScore.objects.exists())
+        out = StringIO()
+        call_command('flush_trending', stdout=out)
+        self.assertIn('Учтено просмотров: 1', out.getvalue())
+        score = PostScore.objects.get(pk=self.viewed.pk).score
+        # Повторный просмотр того же зрителя не считается.
+        self.client.get(url)
+        self.assertEqual(flush_views(), 0)
+        self.assertEqual(PostScore.objects.get(pk=self.viewed.pk).score,
+                         score)
+        Comment.objects.create(post=self.discussed, author=self.reader,
+                               text='Комментарий')
+        self.assertTrue(GroupScore.objects.filter(pk=self.group.pk).exists())
+        response = self.client.get(reverse('posts:trending'))
+        self.assertEqual(response.context['posts'],
+                         [self.discussed, self.viewed])
+        self.assertEqual(response.context['groups'], [self.group])
+
+    def test_views_are_flushed_once_per_post(self):
+        for number in range(3):
+            client = Client(REMOTE_ADDR=f'10.0.0.{number}')
+            client.get(reverse('posts:post_detail',
+                               args=[self.discussed.pk]))
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(flush_views(), 3)
+        writes = [query for query in context.captured_queries
+                  if query['sql'].startswith(('INSERT', 'UPDATE'))]
+        # По одной записи на пост и на группу, а не на каждый просмотр.
+        self.assertEqual(len(writes), 2)
+        expected = log_weight('view') + math.log(3)
+        self.assertAlmostEqual(
+            PostScore.objects.get(pk=self.discussed.pk).score, expected,
+            places=3)
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_view_does_not_pin_reader_to_primary(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.viewed.pk]))
+        self.assertNotIn('read_primary_until', response.cookies)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'core.cache.LocMemCache'}})
+    def test_process_local_cache_records_view_directly(self):
+        # Журнал в памяти процесса команда flush_trending не увидит.
+        self.client.get(reverse('posts:post_detail', args=[self.viewed.pk]))
+        self.assertTrue(PostScore.objects.filter(pk=self.viewed.pk).exists())
+        self.assertEqual(flush_views(), 0)
+
+    def test_follow_lifts_latest_post(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            list(PostScore.objects.values_list('pk', flat=True)),
+            [self.discussed.pk])
@@ -0,0 +1,170 @@
+"""Популярные посты и группы с затухающей во времени оценкой.
+
+Событие весом w в момент t добавляет к оценке w * 2 ** ((t - EPOCH) /
+HALF_LIFE): чем новее событие, тем больше вклад, а относительный порядок
+уже накопленных оценок со временем не меняется, поэтому их не нужно
+пересчитывать. Чтобы экспонента не переполнялась, хранится логарифм
+суммы, и новое событие прибавляется через logaddexp. Страница
+популярного читает верхние строки по индексу score.
+
+Просмотры приходят GET-запросами, и запись из них закрепляла бы
+читателя за основной базой (см. core.db.routers). Поэтому просмотр
+только кладётся в журнал в общем кеше, а в оценки журнал переносит
+команда flush_trending, запускаемая по расписанию, одним обновлением
+на пост. Журнал в кеше одного процесса команда не увидит, поэтому с
+таким кешем (LocMemCache, DummyCache) просмотр пишется в оценку сразу.
+"""
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from core.cache import is_process_local
+
+from .models import Group, GroupScore, Post, PostScore, User
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+WEIGHTS = {
+    'view': 1.0,
+    'follow': 3.0,
+    'comment': 5.0,
+}
+VIEW_KEY = 'posts:trending:view:{}:{}'
+VIEW_SEQ_KEY = 'posts:trending:views'
+VIEW_EVENT_KEY = 'posts:trending:views:{}'
+VIEW_FLUSHED_KEY = 'posts:trending:views-flushed'
+FLUSH_LOCK_KEY = 'posts:trending:flush-lock'
+VIEW_EVENT_TIMEOUT = 60 * 60 * 24
+FLUSH_LOCK_TIMEOUT = 60 * 5
+FLUSH_BATCH_SIZE = 1000
+
+
+def log_weight(event, when=None):
+    when = when or timezone.now()
+    age = (when - EPOCH).total_seconds()
+    return (math.log(WEIGHTS[event])
+            + age * math.log(2) / settings.TRENDING_HALF_LIFE)
+
+
+def logaddexp(first, second):
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def _bump(model, pk, value):
+    # Вместо блокировки строки обновляем при неизменной старой оценке:
+    # если её успели поменять, UPDATE ничего не найдёт и повторим.
+    # Оценку читаем там же, куда пишем: реплика может отставать.
+    rows = model.objects.using(router.db_for_write(model))
+    while True:
+        score = rows.filter(pk=pk).values_list('score', flat=True).first()
+        if score is None:
+            _, created = rows.get_or_create(pk=pk,
+                                            defaults={'score': value})
+            if created:
+                return
+        elif rows.filter(pk=pk, score=score).update(
+                score=logaddexp(score, value)):
+            return
+
+
+def record(event, post_id, group_id=None):
+    """Учитывает событие для поста и его группы."""
+    value = log_weight(event)
+    _bump(PostScore, post_id, value)
+    if group_id:
+        _bump(GroupScore, group_id, value)
+
+
+def record_view(request, post):
+    """Просмотр считается один раз на зрителя за TRENDING_VIEW_TIMEOUT.
+
+    С общим кешем в базу ничего не пишется: событие ждёт flush_views в
+    журнале.
+    """
+    viewer = request.user.pk or request.META.get('REMOTE_ADDR')
+    if not cache.add(VIEW_KEY.format(post.pk, viewer), True,
+                     settings.TRENDING_VIEW_TIMEOUT):
+        return
+    if is_process_local():
+        record('view', post.pk, post.group_id)
+        return
+    cache.add(VIEW_SEQ_KEY, 0, None)
+    try:
+        number = cache.incr(VIEW_SEQ_KEY)
+    except ValueError:
+        return
+    cache.set(VIEW_EVENT_KEY.format(number),
+              (post.pk, post.group_id, timezone.now()), VIEW_EVENT_TIMEOUT)
+
+
+def _accumulate(totals, key, value):
+    totals[key] = logaddexp(totals[key], value) if key in totals else value
+
+
+def flush_views():
+    """Переносит журнал просмотров в оценки; возвращает число событий."""
+    if not cache.add(FLUSH_LOCK_KEY, True, FLUSH_LOCK_TIMEOUT):
+        return 0
+    try:
+        last = cache.get(VIEW_SEQ_KEY) or 0
+        start = cache.get(VIEW_FLUSHED_KEY) or 0
+        if start > last:
+            # Счётчик вытеснили из кеша, и нумерация началась заново.
+            start = 0
+        posts, groups = {}, {}
+        count = 0
+        for begin in range(start + 1, last + 1, FLUSH_BATCH_SIZE):
+            keys = [VIEW_EVENT_KEY.format(number) for number in
+                    range(begin, min(begin + FLUSH_BATCH_SIZE, last + 1))]
+            # Запись, которую писатель ещё не успел положить, теряется:
+            # это один просмотр.
+            for post_id, group_id, when in cache.get_many(keys).values():
+                value = log_weight('view', when)
+                _accumulate(posts, post_id, value)
+                if group_id:
+                    _accumulate(groups, group_id, value)
+                count += 1
+            cache.delete_many(keys)
+        # Пост или группу могли удалить, пока просмотр ждал в журнале.
+        for model, scores, totals in ((Post, PostScore, posts),
+                                      (Group, GroupScore, groups)):
+            existing = model.objects.filter(pk__in=totals).values_list(
+                'pk', flat=True)
+            for pk in existing:
+                _bump(scores, pk, totals[pk])
+        cache.set(VIEW_FLUSHED_KEY, last, None)
+        return count
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
+
+
+def record_follows(author_ids):
+    """Подписка поднимает последний пост каждого автора."""
+    if not author_ids:
+        return
+    latest = (Post.objects.filter(author_id=OuterRef('pk'))
+              .order_by('-pub_date', '-pk').values('pk')[:1])
+    posts = Post.objects.filter(
+        pk__in=User.objects.filter(pk__in=author_ids)
+        .annotate(post_id=Subquery(latest)).values('post_id'),
+    ).values_list('pk', 'group_id')
+    for post_id, group_id in posts:
+        record('follow', post_id, group_id)
+
+
+def top_posts(limit=None):
+    rows = (PostScore.objects.order_by('-score')
+            .select_related('post__author', 'post__group')
+            [:limit or settings.TRENDING_SIZE])
+    return [row.post for row in rows]
+
+
+def top_groups(limit=5):
+    rows = (GroupScore.objects.order_by('-score')
+            .select_related('group')[:limit])
+    return [row.group for row in rows]
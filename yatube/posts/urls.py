@@ -1,18 +1,28 @@
 from django.urls import path
 
-from . import views
+from . import api, feeds, live, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='main_page'),
+    path('trending/', views.trending_posts, name='trending'),
+    path('groups/', views.groups, name='groups'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/followers/', views.followers,
+         name='followers'),
+    path('profile/<str:username>/following/', views.following,
+         name='following'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('posts/<int:post_id>/comment/', views.add_comment,
          name='add_comment'),
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
+    path('posts/<int:post_id>/comments/<int:comment_id>/replies/',
+         views.comment_replies, name='comment_replies'),
     path('follow/', views.follow_index, name='follow_index'),
     path(
         'profile/<str:username>/follow/',
@@ -23,5 +33,28 @@ urlpatterns = [
         'profile/<str:username>/unfollow/',
         views.profile_unfollow,
         name="profile_unfollow"),
-
+    path('rss/', feeds.index_rss, name='index_rss'),
+    path('atom/', feeds.index_atom, name='index_atom'),
+    path('group/<slug:slug>/rss/', feeds.group_rss, name='group_rss'),
+    path('group/<slug:slug>/atom/', feeds.group_atom, name='group_atom'),
+    path('profile/<str:username>/rss/', feeds.profile_rss,
+         name='profile_rss'),
+    path('profile/<str:username>/atom/', feeds.profile_atom,
+         name='profile_atom'),
+    path('sitemap.xml', views.sitemap, name='sitemap'),
+    path('sitemaps/<str:filename>', views.sitemap, name='sitemap_section'),
+    path('api/posts/', api.index, name='api_index'),
+    path('api/posts/<int:post_id>/', api.post_detail,
+         name='api_post_detail'),
+    path('api/group/<slug:slug>/', api.group_posts, name='api_group_list'),
+    path('api/profile/<str:username>/', api.profile, name='api_profile'),
+    path('api/posts/new/', api.index_new, name='api_index_new'),
+    path('api/group/<slug:slug>/new/', api.group_new, name='api_group_new'),
+    path('api/profile/<str:username>/new/', api.profile_new,
+         name='api_profile_new'),
+    path('api/follow/new/', api.follow_new, name='api_follow_new'),
+    path('api/follow/bulk/', api.follow_bulk, name='api_follow_bulk'),
+    path('live/', live.index, name='live_index'),
+    path('group/<slug:slug>/live/', live.group_posts, name='live_group'),
+    path('follow/live/', live.follow_index, name='live_follow'),
 ]
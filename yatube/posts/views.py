@@ -1,70 +1,285 @@
+import os
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.db.models import Count, OuterRef, Subquery
+from django.http import (FileResponse, Http404, HttpResponseBadRequest,
+                         JsonResponse)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_safe
 
+from . import counters, graph, trending
+from .changes import GROUPS_SCOPE, INDEX_SCOPE, cache_timeout, scope_version
+from .following import FollowState
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, User, subtree_bounds
+from .pagination import (COMMENT_ORDERING, FEED_ORDERING, FOLLOW_ORDERING,
+                         InvalidCursor, KeysetPaginator)
+from .recommendations import recommendations_for
+from .sitemaps import INDEX_NAME, is_sitemap_file
+from .subscriptions import follow_authors, unfollow_authors
+
+GROUPS_KEY = 'posts:groups:{}:{}'
 
 
 def paginate_func(request, posts):
-    paginator = Paginator(posts, settings.PAGINATOR_VALUE)
+    paginator = Paginator(posts.order_by(*FEED_ORDERING),
+                          settings.PAGINATOR_VALUE)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
+def fragment_url(request, cursor):
+    return f'{request.path}?fragment=1&cursor={cursor}'
+
+
+def next_fragment(request, posts, page_obj):
+    """Адрес фрагмента со следующими постами после страницы page_obj."""
+    if not page_obj.has_next():
+        return None
+    paginator = KeysetPaginator(posts, FEED_ORDERING,
+                                settings.PAGINATOR_VALUE)
+    return fragment_url(request,
+                        paginator.encode_cursor(page_obj[-1]))
+
+
+def render_fragment(request, posts):
+    """Только карточки постов для бесконечной прокрутки."""
+    paginator = KeysetPaginator(posts, FEED_ORDERING,
+                                settings.PAGINATOR_VALUE)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return HttpResponseBadRequest('Invalid cursor')
+    response = render(request, 'posts/includes/post_cards.html',
+                      {'posts': page})
+    if page.has_next:
+        response['X-Next-Page'] = fragment_url(request, page.next_cursor)
+    return response
+
+
 @cache_page(20)
 def index(request):
     post_list = Post.objects.select_related("group", "author")
+    if request.GET.get('fragment'):
+        return render_fragment(request, post_list)
     page_obj = paginate_func(request, post_list)
     context = {
         'page_obj': page_obj,
+        'next_fragment': next_fragment(request, post_list, page_obj),
     }
     return render(request, 'posts/index.html', context)
 
 
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
+    posts = group.posts.select_related('author', 'group')
+    if request.GET.get('fragment'):
+        return render_fragment(request, posts)
     page_obj = paginate_func(request, posts)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'next_fragment': next_fragment(request, posts, page_obj),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+def group_directory():
+    """Группы с числом постов и последним постом одним запросом.
+
+    Результат кешируется до изменения любого поста (версия общей ленты
+    меняется при создании, удалении и переносе поста в другую группу)
+    или самих групп.
+    """
+    key = GROUPS_KEY.format(scope_version(INDEX_SCOPE),
+                            scope_version(GROUPS_SCOPE))
+    groups = cache.get(key)
+    if groups is None:
+        latest = (Post.objects.filter(group=OuterRef('pk'))
+                  .order_by(*FEED_ORDERING))
+        groups = list(
+            Group.objects.annotate(
+                posts_count=Count('posts'),
+                latest_id=Subquery(latest.values('pk')[:1]),
+                latest_text=Subquery(latest.values('text')[:1]),
+                latest_date=Subquery(latest.values('pub_date')[:1]),
+            ).order_by('title').values(
+                'title', 'slug', 'posts_count',
+                'latest_id', 'latest_text', 'latest_date')
+        )
+        cache.set(key, groups, cache_timeout())
+    return groups
+
+
+@require_safe
+def groups(request):
+    return render(request, 'posts/groups.html',
+                  {'groups': group_directory()})
+
+
 def profile(request, username):
     author = get_object_or_404(User, username=username)
     posts = author.posts.select_related('author', 'group')
+    if request.GET.get('fragment'):
+        return render_fragment(request, posts)
     page_obj = paginate_func(request, posts)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user,
-        author=author).exists()
+    following = author in FollowState(request.user)
+    viewer_id = request.user.pk
+    follows_you = bool(viewer_id) and graph.is_following(author.pk,
+                                                         viewer_id)
+    followed_by, followed_by_count = [], 0
+    if viewer_id and viewer_id != author.pk:
+        followed_by, followed_by_count = graph.followed_by_following(
+            viewer_id, author.pk, settings.FOLLOWED_BY_PREVIEW)
+    followers_count, following_count = counters.follow_counts(author.pk)
     context = {
         'following': following,
+        'followers_count': followers_count,
+        'following_count': following_count,
+        'follows_you': follows_you,
+        'followed_by': (User.objects.filter(pk__in=followed_by)
+                        if followed_by else []),
+        'followed_by_more': followed_by_count - len(followed_by),
+        'recommendations': (recommendations_for(request.user)
+                            if viewer_id == author.pk else []),
         'author': author,
         'page_obj': page_obj,
+        'next_fragment': next_fragment(request, posts, page_obj),
         'postscount': posts.count(),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def follow_list(request, author, follows, related, title):
+    """Подписчики или подписки автора по ключу Follow.pk.
+
+    Счётчики читаются из FollowCounter, а не COUNT по таблице.
+    """
+    paginator = KeysetPaginator(follows.select_related(related),
+                                FOLLOW_ORDERING,
+                                settings.FOLLOW_PAGINATOR_VALUE)
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return HttpResponseBadRequest('Invalid cursor')
+    users = [getattr(follow, related) for follow in page]
+    if request.GET.get('fragment'):
+        response = render(request, 'posts/includes/user_list.html',
+                          {'users': users})
+        if page.has_next:
+            response['X-Next-Page'] = fragment_url(request,
+                                                   page.next_cursor)
+        return response
+    followers_count, following_count = counters.follow_counts(author.pk)
+    context = {
+        'author': author,
+        'title': title,
+        'users': users,
+        'followers_count': followers_count,
+        'following_count': following_count,
+        'next_page': (f'{request.path}?cursor={page.next_cursor}'
+                      if page.has_next else None),
+        'next_fragment': (fragment_url(request, page.next_cursor)
+                          if page.has_next else None),
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+@require_safe
+def followers(request, username):
+    author = get_object_or_404(User, username=username)
+    return follow_list(request, author, Follow.objects.filter(author=author),
+                       'user', 'Подписчики')
+
+
+@require_safe
+def following(request, username):
+    author = get_object_or_404(User, username=username)
+    return follow_list(request, author, Follow.objects.filter(user=author),
+                       'author', 'Подписки')
+
+
+def comments_page(post_id, cursor=None):
+    """Порция корневых комментариев; ответы грузятся по ветке."""
+    paginator = KeysetPaginator(
+        Comment.objects.filter(post_id=post_id, depth=0)
+        .select_related('author'),
+        COMMENT_ORDERING, settings.COMMENTS_PAGINATOR_VALUE)
+    return paginator.page(cursor)
+
+
+def comments_url(post_id, cursor):
+    url = reverse('posts:post_comments', kwargs={'post_id': post_id})
+    return f'{url}?cursor={cursor}'
+
+
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
     form = CommentForm()
-    comments = post.comments.all()
+    comments = comments_page(post.pk)
+    trending.record_view(request, post)
 
     context = {
         'post': post,
         'form': form,
         'comments': comments,
-
+        'next_comments': (comments_url(post.pk, comments.next_cursor)
+                          if comments.has_next else None),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@require_safe
+def post_comments(request, post_id):
+    """Следующая порция комментариев для кнопки «Показать ещё»."""
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    try:
+        comments = comments_page(post_id, request.GET.get('cursor'))
+    except InvalidCursor:
+        return HttpResponseBadRequest('Invalid cursor')
+    response = render(request, 'includes/comment_list.html',
+                      {'comments': comments})
+    if comments.has_next:
+        response['X-Next-Page'] = comments_url(post_id, comments.next_cursor)
+    return response
+
+
+@require_safe
+def comment_replies(request, post_id, comment_id):
+    """Ветка ответов одним диапазонным запросом по пути.
+
+    Отдаются COMMENT_THREAD_DEPTH уровней под комментарием в порядке
+    обхода дерева; у более глубоких ответов видно только число ответов.
+    """
+    comment = get_object_or_404(Comment.objects.only('path', 'depth'),
+                                pk=comment_id, post_id=post_id)
+    lower, upper = subtree_bounds(comment.path)
+    collapse_depth = comment.depth + settings.COMMENT_THREAD_DEPTH
+    paginator = KeysetPaginator(
+        Comment.objects.filter(path__gt=lower, path__lt=upper,
+                               depth__lte=collapse_depth)
+        .select_related('author'),
+        ('path',), settings.COMMENTS_PAGINATOR_VALUE)
+    try:
+        replies = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return HttpResponseBadRequest('Invalid cursor')
+    next_url = None
+    if replies.has_next:
+        next_url = f'{request.path}?cursor={replies.next_cursor}'
+    return render(request, 'includes/comment_thread.html', {
+        'comments': replies,
+        'collapse_depth': collapse_depth,
+        'next_url': next_url,
+    })
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None,)
@@ -94,24 +309,68 @@ def post_edit(request, post_id):
                   {'form': form, 'is_edit': True, 'post': post})
 
 
+def comment_response(request, comment):
+    """Ответ на fetch: только новый комментарий, HTML или JSON."""
+    if 'application/json' in request.META.get('HTTP_ACCEPT', ''):
+        return JsonResponse({
+            'id': comment.pk,
+            'author': comment.author.username,
+            'text': comment.text,
+            'created': comment.created,
+        }, status=201, json_dumps_params={'ensure_ascii': False})
+    return render(request, 'includes/comment.html', {'comment': comment},
+                  status=201)
+
+
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
+    # Форма состоит из одного поля, родитель ответа приходит отдельно.
+    parent_id = request.POST.get('parent', '')
+    parent = None
+    if parent_id:
+        parent = (Comment.objects.filter(post=post, pk=parent_id).first()
+                  if parent_id.isdigit() else None)
+        if parent is None:
+            form.add_error(None, 'Комментарий для ответа не найден')
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        comment.parent = parent
         comment.save()
+        if request.is_ajax():
+            return comment_response(request, comment)
+    elif request.is_ajax():
+        return JsonResponse({'errors': form.errors}, status=400,
+                            json_dumps_params={'ensure_ascii': False})
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@require_safe
+def trending_posts(request):
+    """Популярное: верхние строки таблиц оценок, без агрегатов."""
+    context = {
+        'posts': trending.top_posts(),
+        'groups': trending.top_groups(),
+        'trending': True,
+    }
+    return render(request, 'posts/trending.html', context)
+
+
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = Post.objects.filter(
+        author__following__user=request.user
+    ).select_related('author', 'group')
+    if request.GET.get('fragment'):
+        return render_fragment(request, posts)
     page_obj = paginate_func(request, posts)
     context = {
         'page_obj': page_obj,
+        'next_fragment': next_fragment(request, posts, page_obj),
+        'recommendations': recommendations_for(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -120,7 +379,7 @@ def follow_index(request):
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        follow_authors(request.user, [author.pk])
     return redirect('posts:follow_index')
 
 
@@ -128,5 +387,21 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user.username != username:
-        Follow.objects.filter(user=request.user, author=author).delete()
+        unfollow_authors(request.user, [author.pk])
     return redirect('posts:follow_index')
+
+
+@require_safe
+def sitemap(request, filename=INDEX_NAME):
+    """Готовые файлы карты сайта.
+
+    В боевой конфигурации SITEMAP_ROOT лучше отдавать веб-сервером, а
+    это запасной вариант: только имена индекса и кусков.
+    """
+    if not is_sitemap_file(filename):
+        raise Http404
+    path = os.path.join(settings.SITEMAP_ROOT, filename)
+    try:
+        return FileResponse(open(path, 'rb'), content_type='application/xml')
+    except FileNotFoundError:
+        raise Http404
@@ -0,0 +1,82 @@
+// Комментарии без перезагрузки страницы: отправка формы (сервер
+// возвращает только разметку нового комментария), ответы в ветке и
+// подгрузка свёрнутых веток. Без JS форма работает как обычно.
+(function () {
+  const form = document.querySelector('[data-comment-form]');
+  const comments = document.querySelector('[data-comments]');
+  if (!form || !comments) {
+    return;
+  }
+  const errors = form.querySelector('[data-comment-errors]');
+  const button = form.querySelector('[type=submit]');
+  const parent = form.querySelector('[name=parent]');
+  const hint = form.querySelector('[data-reply-hint]');
+
+  function setParent(id, author) {
+    parent.value = id || '';
+    hint.hidden = !id;
+    hint.querySelector('span').textContent = author || '';
+  }
+
+  document.addEventListener('click', async (event) => {
+    const reply = event.target.closest('[data-reply]');
+    if (reply) {
+      setParent(reply.dataset.reply, reply.dataset.replyAuthor);
+      form.querySelector('textarea').focus();
+      return;
+    }
+    if (event.target.closest('[data-reply-cancel]')) {
+      setParent(null);
+      return;
+    }
+    const replies = event.target.closest('[data-replies]');
+    if (!replies) {
+      return;
+    }
+    event.preventDefault();
+    const response = await fetch(replies.href, {
+      credentials: 'same-origin',
+      headers: {'X-Requested-With': 'XMLHttpRequest'},
+    });
+    if (response.ok) {
+      const anchor = replies.closest('[data-comment]') || replies;
+      anchor.insertAdjacentHTML('afterend', await response.text());
+      replies.remove();
+    }
+  });
+
+  form.addEventListener('submit', async (event) => {
+    event.preventDefault();
+    button.disabled = true;
+    errors.textContent = '';
+    try {
+      const response = await fetch(form.action, {
+        method: 'POST',
+        body: new FormData(form),
+        credentials: 'same-origin',
+        headers: {'X-Requested-With': 'XMLHttpRequest'},
+      });
+      if (response.status === 201) {
+        const html = await response.text();
+        const target = parent.value &&
+          document.getElementById(`comment-${parent.value}`);
+        if (target) {
+          target.insertAdjacentHTML('afterend', html);
+        } else {
+          comments.insertAdjacentHTML('beforeend', html);
+        }
+        form.reset();
+        setParent(null);
+      } else if (response.status === 400) {
+        const data = await response.json();
+        errors.textContent = Object.values(data.errors).flat().join(' ');
+      } else {
+        form.submit();
+      }
+    } catch (error) {
+      form.submit();
+    } finally {
+      button.disabled = false;
+    }
+  });
+})();
@@ -0,0 +1,65 @@
+// Бесконечная прокрутка: дописывает в [data-feed] карточки постов или
+// комментарии, которые сервер отдаёт фрагментами; адрес следующего
+// фрагмента приходит в заголовке X-Next-Page.
+(function () {
+  const button = document.querySelector('[data-load-more]');
+  const feed = document.querySelector('[data-feed]');
+  if (!button || !feed) {
+    return;
+  }
+  let loading = false;
+  let observer = null;
+
+  async function loadMore() {
+    const url = button.dataset.url;
+    if (loading || !url) {
+      return;
+    }
+    loading = true;
+    try {
+      const response = await fetch(url, {
+        credentials: 'same-origin',
+        headers: {'X-Requested-With': 'XMLHttpRequest'},
+      });
+      if (!response.ok) {
+        return;
+      }
+      const fragment = document.createElement('template');
+      fragment.innerHTML = await response.text();
+      // Пропускаем уже показанные элементы, например комментарий,
+      // добавленный без перезагрузки до подгрузки его порции.
+      fragment.content.querySelectorAll('[id]').forEach((element) => {
+        if (document.getElementById(element.id)) {
+          element.remove();
+        }
+      });
+      feed.append(fragment.content);
+      // Номера страниц после подгрузки уже не соответствуют ленте.
+      const pagination = document.querySelector('nav .pagination');
+      if (pagination) {
+        pagination.closest('nav').hidden = true;
+      }
+      const next = response.headers.get('X-Next-Page');
+      if (next) {
+        button.dataset.url = next;
+      } else {
+        button.remove();
+        if (observer) {
+          observer.disconnect();
+        }
+      }
+    } finally {
+      loading = false;
+    }
+  }
+
+  button.addEventListener('click', loadMore);
+  if ('IntersectionObserver' in window) {
+    observer = new IntersectionObserver((entries) => {
+      if (entries.some((entry) => entry.isIntersecting)) {
+        loadMore();
+      }
+    }, {rootMargin: '400px'});
+    observer.observe(button);
+  }
+})();
@@ -47,7 +47,6 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 INTERNAL_IPS = [
@@ -55,6 +54,11 @@ INTERNAL_IPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SlowQueryMiddleware',
+    'core.middleware.TemplateProfilingMiddleware',
+    'core.middleware.SamplingProfilerMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,9 +66,12 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE += ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
@@ -80,6 +87,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'posts.context_processors.follow_state',
             ],
         },
     },
@@ -93,11 +101,41 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
 
+# PostgreSQL включается переменной POSTGRES_DB (нужен psycopg2, см.
+# requirements-postgres.txt). Соединения переиспользуются между
+# запросами CONN_MAX_AGE секунд. За PgBouncer в режиме transaction
+# серверные курсоры надо отключить: POSTGRES_PGBOUNCER=1.
+if os.getenv('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv('POSTGRES_DB'),
+        'USER': os.getenv('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+        'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+        'PORT': os.getenv('POSTGRES_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.getenv('POSTGRES_CONN_MAX_AGE', 60)),
+        'DISABLE_SERVER_SIDE_CURSORS': bool(
+            os.getenv('POSTGRES_PGBOUNCER')),
+    }
+
+# Реплики для чтения перечисляются в DATABASE_REPLICAS. Псевдоним replica
+# смотрит на основную базу, пока ему не заданы настройки реплики, а в
+# тестах он зеркало default. Например, копия SQLite:
+# DATABASES['replica'].update(
+#     NAME=os.path.join(BASE_DIR, 'replica.sqlite3'))
+# DATABASE_REPLICAS = ['replica']
+DATABASES['replica'] = {**DATABASES['default'],
+                        'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 10
+REPLICA_STICKY_COOKIE = 'read_primary_until'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -149,9 +187,70 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.LocMemCache',
     }
 }
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 PAGINATOR_VALUE = 10
+COMMENTS_PAGINATOR_VALUE = 20
+FOLLOW_PAGINATOR_VALUE = 30
+# Сколько общих знакомых показывать на странице профиля.
+FOLLOWED_BY_PREVIEW = 3
+# Сколько авторов можно передать в одном запросе массовой подписки.
+BULK_FOLLOW_LIMIT = 500
+# Популярное: период полураспада оценки и повторного учёта просмотра.
+# С общим кешем (memcached, redis) просмотры копятся в нём до запуска
+# команды flush_trending, с кешем в памяти процесса пишутся в базу сразу.
+TRENDING_HALF_LIFE = 60 * 60 * 12
+TRENDING_VIEW_TIMEOUT = 60 * 60
+TRENDING_SIZE = 20
+# Сколько уровней ответов раскрывается за один запрос ветки.
+COMMENT_THREAD_DEPTH = 3
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+# Срок тех же записей с кешем в памяти процесса (LocMemCache): другие
+# воркеры не узнают о смене версии ленты, и запись истекает сама.
+LOCAL_FEED_CACHE_TIMEOUT = 2
+FOLLOWING_CACHE_TIMEOUT = 60 * 60 * 24
+# Граф подписок в памяти процессов (posts.graph). Нужен общий кеш:
+# через него процессы узнают об изменениях друг друга.
+FOLLOW_GRAPH = os.getenv('FOLLOW_GRAPH', '') == '1'
+
+SITEMAP_ROOT = os.path.join(BASE_DIR, 'sitemaps')
+SITEMAP_CHUNK_SIZE = 50000
+# Схема и домен сайта для абсолютных адресов в карте сайта.
+SITEMAP_BASE_URL = os.getenv('SITEMAP_BASE_URL', 'http://127.0.0.1:8000')
+
+# Каталог, куда воркеры сбрасывают свои метрики; None — только свой процесс.
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = INTERNAL_IPS
+
+# Запросы дольше порога попадают в журнал core.SlowQuery; None — выключено.
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_LOG_SIZE = 100
+# Как часто фоновый поток пишет буфер в журнал; None — только flush().
+SLOW_QUERY_FLUSH_INTERVAL = 10
+SLOW_QUERY_BUFFER_SIZE = 1000
+
+# Доля запросов (0..1), для которых замеряется рендеринг шаблонов.
+TEMPLATE_PROFILING_SAMPLE_RATE = 0
+
+# Профилируется 1 из N запросов (0 — только по заголовку X-Profile).
+PROFILER_SAMPLE_EVERY = 0
+PROFILER_INTERVAL = 0.005
+PROFILER_TOKEN_MAX_AGE = 60 * 60
+PROFILER_DIR = os.path.join(BASE_DIR, 'profiles')
+
+# Поток новых постов (posts.live): период опроса версии ленты,
+# keepalive и время жизни одного соединения, в секундах. Соединение
+# занимает воркер целиком, поэтому поток нужно отдавать воркером,
+# который умеет держать много ответов сразу (gunicorn с gevent или
+# uvicorn). С синхронными воркерами держите LIVE_MAX_DURATION коротким
+# или уберите маршруты live.
+LIVE_POLL_INTERVAL = float(os.getenv('LIVE_POLL_INTERVAL', 1))
+LIVE_KEEPALIVE = 10
+LIVE_MAX_DURATION = int(os.getenv('LIVE_MAX_DURATION', 20))
+
+# Сколько секунд кешируется ответ «новых постов с момента X».
+NEW_SINCE_CACHE_TIMEOUT = 2